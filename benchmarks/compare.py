@@ -0,0 +1,31 @@
+import click
+import json
+
+
+@click.command()
+@click.argument("baseline-file")
+@click.argument("results-file")
+def compare(baseline_file, results_file):
+    with open(baseline_file) as file:
+        baseline = json.load(file)
+
+    with open(results_file) as file:
+        results = json.load(file)
+
+    baseline_results = {result["name"]: result for result in baseline["results"]}
+    click.echo(f"{baseline["commit"]} -> {results["commit"]}")
+
+    for result in results["results"]:
+        if result["name"] not in baseline_results:
+            continue
+
+        before = baseline_results[result["name"]]["best_seconds"]
+        after = result["best_seconds"]
+        click.echo(
+            f"{result["name"]:<28}{before * 1000:>10.1f} ms{after * 1000:>10.1f} ms"
+            f"{before / after:>8.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    compare()
@@ -0,0 +1,144 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Offline stand-ins for the services and models the tools depend on.
+
+fake_stopwords = [
+    "de", "het", "een", "en", "van", "ik", "te", "dat", "die", "in", "is",
+    "niet", "je", "zijn", "op", "aan", "met", "als", "voor", "er", "maar",
+    "om", "hem", "dan", "zou", "of", "wat", "mijn", "men", "dit", "zo",
+]  # fmt: skip
+reverso_page_count = 8
+reverso_examples_per_page = 20
+
+
+def make_sentences(words, count, seed=0):
+    generator = random.Random(seed)
+
+    return [
+        " ".join(generator.choice(words) for _ in range(generator.randint(5, 20))) + "."
+        for _ in range(count)
+    ]
+
+
+class FakeReversoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out separately, which Nagle's algorithm would hold
+    # up on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        page = request.get("npage", 1)
+        word = request["source_text"]
+        generator = random.Random(f"{word}-{page}")
+        time.sleep(self.server.latency)
+
+        self.send_json(
+            {
+                "npages": reverso_page_count,
+                "list": [
+                    {
+                        "s_text": " ".join(
+                            [
+                                *generator.sample(self.server.words, 4),
+                                f"<em>{word}</em>",
+                                *generator.sample(self.server.words, 4),
+                            ]
+                        )
+                        + ".",
+                        "t_text": f"Translation {page}-{index}.",
+                    }
+                    for index in range(reverso_examples_per_page)
+                ],
+                "dictionary_entry_list": [],
+            }
+        )
+
+    def send_json(self, response):
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeWiktionaryHandler(FakeReversoHandler):
+    def do_GET(self):
+        term = self.path.rsplit("/", 1)[1]
+        time.sleep(self.server.latency)
+
+        self.send_json(
+            {
+                "nl": [
+                    {
+                        "definitions": [
+                            {
+                                "definition": f"<i>(transitive)</i> to {term}",
+                                "parsedExamples": [
+                                    {
+                                        "example": f"Ik <b>{term}</b> graag.",
+                                        "translation": f"I like to {term}.",
+                                    }
+                                ],
+                            },
+                            {
+                                "definition": "plural of "
+                                '<span class="form-of-definition-link">'
+                                f'<a href="/wiki/{term}#Dutch">{term}</a></span>',
+                            },
+                        ]
+                    }
+                ]
+            }
+        )
+
+
+def start_server(handler, latency, words=()):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.words = list(words)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def start_fake_reverso(words, latency=0.02):
+    server = start_server(FakeReversoHandler, latency, words)
+
+    return (server, f"http://127.0.0.1:{server.server_address[1]}/")
+
+
+def start_fake_wiktionary(latency=0.01):
+    server = start_server(FakeWiktionaryHandler, latency)
+
+    return (server, f"http://127.0.0.1:{server.server_address[1]}/definition")
+
+
+def make_blank_model():
+    # a tokenizer with a lowercasing lemmatizer, for when no Dutch model is
+    # installed
+    import spacy
+    from spacy.language import Language
+
+    if not Language.has_factory("fake_lemmatizer"):
+
+        @Language.component("fake_lemmatizer")
+        def fake_lemmatizer(doc):
+            for token in doc:
+                token.lemma_ = token.text.lower()
+
+            return doc
+
+    nlp = spacy.blank("nl")
+    nlp.add_pipe("fake_lemmatizer")
+
+    return nlp
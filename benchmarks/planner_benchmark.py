@@ -0,0 +1,73 @@
+import itertools
+import random
+import time
+from dutch_frequency_analyzer.planner import plan_word_order
+
+word_count = 10000
+sentences_per_word = 20
+known_ratio = 0.5
+
+
+def make_sentences(words, known_words):
+    random.seed(0)
+    vocabulary = words + known_words
+    # sentences mostly use frequent words, like real ones do
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    random.shuffle(weights)
+    cumulative_weights = list(itertools.accumulate(weights))
+
+    return {
+        word: [
+            [word]
+            + random.choices(
+                vocabulary, cum_weights=cumulative_weights, k=random.randint(3, 12)
+            )
+            for _ in range(sentences_per_word)
+        ]
+        for word in words
+    }
+
+
+def count_single_unknown(order, sentences, known_words):
+    # the words that have a sentence without other unknown words at their turn
+    learned = set(known_words)
+    count = 0
+
+    for word in order:
+        if any(
+            all(lemma == word or lemma in learned for lemma in lemmas)
+            for lemmas in sentences[word]
+        ):
+            count += 1
+
+        learned.add(word)
+
+    return count
+
+
+def main():
+    vocabulary = [
+        f"word{index}" for index in range(int(word_count / (1 - known_ratio)))
+    ]
+    known_words = vocabulary[: len(vocabulary) - word_count]
+    words = vocabulary[len(known_words) :]
+    sentences = make_sentences(words, known_words)
+    known_set = set(known_words)
+
+    start = time.perf_counter()
+    order = plan_word_order(words, sentences.__getitem__, known_set.__contains__)
+    duration = time.perf_counter() - start
+
+    print(f"planning {word_count} words took {duration * 1000:.1f} ms")
+    print(
+        f"{'file order':<20}"
+        f"{count_single_unknown(words, sentences, known_set):>10} words with an i+1 sentence"
+    )
+    print(
+        f"{'planned order':<20}"
+        f"{count_single_unknown(order, sentences, known_set):>10} words with an i+1 sentence"
+    )
+
+
+if __name__ == "__main__":
+    main()
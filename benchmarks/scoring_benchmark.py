@@ -0,0 +1,69 @@
+import random
+import time
+from dutch_frequency_analyzer.shared import get_model, lemmatizer_excluded_components
+from dutch_frequency_analyzer.sentence_finder import analyze_sentence, analyze_sentences
+from dutch_frequency_analyzer.word_index import dutch_words_file_name, read_word_file
+
+# find_candidates scores at most 300 sentences per word
+sentence_count = 300
+page_size = 20
+
+
+def make_sentences(words):
+    random.seed(0)
+
+    return [
+        " ".join(random.choice(words) for _ in range(random.randint(5, 20))) + "."
+        for _ in range(sentence_count)
+    ]
+
+
+def score_one_by_one(nlp, sentences, known_words):
+    for sentence in sentences:
+        analyze_sentence(nlp, sentence, known_words, {})
+
+
+def score_by_page(nlp, sentences, known_words):
+    for start in range(0, len(sentences), page_size):
+        for _ in analyze_sentences(
+            nlp, sentences[start : start + page_size], known_words, {}
+        ):
+            pass
+
+
+def measure(label, function, repeat=3):
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    print(f"{label:<50}{best * 1000:>10.1f} ms per word")
+
+
+def main():
+    words = list(read_word_file(dutch_words_file_name))
+    sentences = make_sentences(words)
+    known_words = set(random.sample(words, len(words) // 2))
+
+    full_nlp = get_model()
+    nlp = get_model(exclude=lemmatizer_excluded_components)
+
+    print(f"scoring {sentence_count} candidate sentences")
+    measure(
+        "one pipe call per sentence, full pipeline",
+        lambda: score_one_by_one(full_nlp, sentences, known_words),
+    )
+    measure(
+        "one pipe call per page, full pipeline",
+        lambda: score_by_page(full_nlp, sentences, known_words),
+    )
+    measure(
+        "one pipe call per page, lemma components only",
+        lambda: score_by_page(nlp, sentences, known_words),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+import time
+
+entry_points = {
+    "analyzer": "dutch_frequency_analyzer.analyzer:analyzer",
+    "finder": "dutch_frequency_analyzer.sentence_finder:finder",
+    "merger": "dutch_frequency_analyzer.merger:merger",
+    "generator": "dutch_frequency_analyzer.deck_generator:generator",
+}
+repeat = 5
+
+
+def run_help(entry_point):
+    module_name, command_name = entry_point.split(":")
+    # the same thing the installed script does, minus the wrapper
+    code = (
+        f"from {module_name} import {command_name}; "
+        f"{command_name}(['--help'], standalone_mode=False)"
+    )
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL)
+
+    return time.perf_counter() - start
+
+
+def run_baseline():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+
+    return time.perf_counter() - start
+
+
+def main():
+    baseline = min(run_baseline() for _ in range(repeat))
+    print(f"{'python -c pass':<20}{baseline * 1000:>10.1f} ms")
+
+    for name, entry_point in entry_points.items():
+        best = min(run_help(entry_point) for _ in range(repeat))
+        print(f"{f'{name} --help':<20}{best * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
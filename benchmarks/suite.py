@@ -0,0 +1,334 @@
+import click
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from benchmarks import fakes
+from dutch_frequency_analyzer import analyzer, deck_generator, sentence_finder, shared
+from dutch_frequency_analyzer.known_words import load_known_words
+from dutch_frequency_analyzer.rate_limiter import RateLimiter
+from dutch_frequency_analyzer.word_index import (
+    build_word_index,
+    dutch_words_file_name,
+    load_dutch_words,
+    read_word_file,
+    stopwords_index_file_name,
+)
+
+# Every benchmark runs in a fresh temporary directory, as all the caches live
+# in the working directory, and talks to local fakes instead of the real
+# services. The fakes answer right away apart from a small fixed latency, so
+# the results are about this code rather than the network.
+
+repo_dir_name = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+parser_line_count = 100_000
+benchmarks = {}
+
+
+def benchmark(unit):
+    def register(setup):
+        benchmarks[setup.__name__] = (setup, unit)
+        return setup
+
+    return register
+
+
+@benchmark("sentences")
+def lemmatize_throughput(context):
+    sentences = fakes.make_sentences(context["words"], 2000)
+
+    def run():
+        for _ in shared.lemmatize_texts(context["nlp"], sentences):
+            pass
+
+    return (len(sentences), run)
+
+
+@benchmark("lines")
+def analyzer_book(context):
+    lines = fakes.make_sentences(context["words"], 20_000)
+
+    with open("book.txt", "w") as file:
+        file.writelines(f"{line}\n" for line in lines)
+
+    # the dictionary index is built once per working directory, which is
+    # not what this measures
+    load_dutch_words()
+
+    # ranks the book the same way `analyzer book.txt --export` does
+    return (
+        len(lines),
+        lambda: analyzer.analyzer(
+            ["book.txt", "--export", "ranking.json"], standalone_mode=False
+        ),
+    )
+
+
+@benchmark("lemmas")
+def rank_corpus(context):
+    # the lemma counts of a corpus of books, as they come out of the cache
+    generator = random.Random(0)
+    words = context["words"]
+    book_lemma_counts = {
+        f"book{book}.txt": {
+            word: generator.randint(1, 1000) for word in generator.sample(words, 20_000)
+        }
+        for book in range(50)
+    }
+    dutch_words = load_dutch_words()
+
+    def run():
+        word_counts, first_seen = analyzer.count_words(
+            book_lemma_counts, dutch_words, set()
+        )
+
+        for _ in analyzer.rank_words(word_counts, first_seen, dutch_words, 0.95, 4):
+            pass
+
+    return (sum(len(counts) for counts in book_lemma_counts.values()), run)
+
+
+@benchmark("words")
+def find_candidates(context):
+    words = context["words"][1000:1010]
+
+    def run():
+        for word in words:
+            sentence_finder.find_candidates(context["nlp"], word, set(), {})
+
+    return (len(words), run)
+
+
+@benchmark("terms")
+def term_lookup(context):
+    terms = context["words"][:200]
+
+    def run():
+        for term in terms:
+            shared.term_lookup(term)
+
+    return (len(terms), run)
+
+
+@benchmark("terms")
+def term_lookup_cached(context):
+    terms = context["words"][:200]
+
+    for term in terms:
+        shared.term_lookup(term)
+
+    def run():
+        for term in terms:
+            shared.term_lookup(term)
+
+    return (len(terms), run)
+
+
+@benchmark("lines")
+def load_known_words_file(context):
+    with open("known.txt", "w") as file:
+        file.writelines(f"word{index}\n" for index in range(parser_line_count))
+
+    return (parser_line_count, lambda: load_known_words("known.txt"))
+
+
+@benchmark("lines")
+def load_unknown_words_file(context):
+    with open("unknown.txt", "w") as file:
+        file.writelines(
+            f"word{index} {parser_line_count - index}\n"
+            for index in range(parser_line_count)
+        )
+
+    return (parser_line_count, lambda: shared.load_unknown_words("unknown.txt"))
+
+
+@benchmark("lines")
+def load_sentences_file(context):
+    write_output_dir("output", context["words"], parser_line_count)
+
+    return (
+        parser_line_count,
+        lambda: shared.load_sentences("output", extended=True),
+    )
+
+
+@benchmark("notes")
+def generator_package(context):
+    note_count = 500
+    write_output_dir("output", context["words"], note_count, audio=True)
+
+    return (
+        note_count,
+        lambda: deck_generator.generator(
+            ["output", "Benchmark", ".", "--jobs", "8"], standalone_mode=False
+        ),
+    )
+
+
+@benchmark("notes")
+def generator_rebuild(context):
+    # a deck built before, with a few sentences added since
+    note_count = 500
+    added_count = 10
+    write_output_dir("output", context["words"], note_count, audio=True)
+    deck_generator.generator(
+        ["output", "Benchmark", ".", "--jobs", "8"], standalone_mode=False
+    )
+
+    with open(f"output/{shared.output_file_name}", "a") as file:
+        for index in range(added_count):
+            file.write(f"added{index}\tSentence {index}.\tTranslation.\t0.mp3\n")
+
+    return (
+        added_count,
+        lambda: deck_generator.generator(
+            ["output", "Benchmark", ".", "--jobs", "8", "--changed-only"],
+            standalone_mode=False,
+        ),
+    )
+
+
+def write_output_dir(output_dir, words, count, audio=False):
+    os.mkdir(output_dir)
+    sentences = fakes.make_sentences(words, count)
+
+    with open(f"{output_dir}/{shared.output_file_name}", "w") as file:
+        for index, sentence in enumerate(sentences):
+            file.write(
+                f"{words[index % len(words)]}{index}\t{sentence}\t"
+                f"Translation {index}.\t{index}.mp3\n"
+            )
+
+            # stands in for synthesized speech
+            if audio:
+                with open(f"{output_dir}/{index}.mp3", "wb") as audio_file:
+                    audio_file.write(bytes(4096))
+
+
+def prepare_directory(directory_name):
+    os.chdir(directory_name)
+    os.symlink(
+        os.path.join(repo_dir_name, dutch_words_file_name), dutch_words_file_name
+    )
+    # built from a fixed list, as the NLTK download needs the network
+    build_word_index(fakes.fake_stopwords, stopwords_index_file_name)
+
+    # the caches are opened lazily in the working directory
+    shared.wiktionary_cache = None
+    shared.wiktionary_limiter = RateLimiter(
+        rate=10_000, max_rate=10_000, min_rate=10_000, burst=10_000
+    )
+
+
+def run_benchmark(name, context, repeat):
+    setup, unit = benchmarks[name]
+    timings = []
+
+    for _ in range(repeat):
+        previous_dir_name = os.getcwd()
+
+        with tempfile.TemporaryDirectory() as directory_name:
+            try:
+                prepare_directory(directory_name)
+                items, run = setup(context)
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+            finally:
+                if shared.wiktionary_cache is not None:
+                    shared.wiktionary_cache.close()
+
+                os.chdir(previous_dir_name)
+
+    best = min(timings)
+
+    return {
+        "name": name,
+        "unit": unit,
+        "items": items,
+        "best_seconds": best,
+        "mean_seconds": sum(timings) / len(timings),
+        "items_per_second": items / best,
+    }
+
+
+def get_model():
+    import spacy
+
+    # load_spacy_model would try to download a missing model
+    if not spacy.util.is_package(shared.spacy_model_name):
+        return (fakes.make_blank_model(), "blank")
+
+    return (
+        shared.load_spacy_model(
+            shared.spacy_model_name, exclude=shared.lemmatizer_excluded_components
+        ),
+        shared.spacy_model_name,
+    )
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=repo_dir_name,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@click.command()
+@click.option("--output", "output_file", help="Write the results as JSON here.")
+@click.option("--repeat", default=3, type=click.IntRange(min=1))
+@click.option(
+    "--only",
+    multiple=True,
+    type=click.Choice(tuple(benchmarks)),
+    help="Benchmark to run, can be given more than once.",
+)
+def suite(output_file, repeat, only):
+    words = list(read_word_file(os.path.join(repo_dir_name, dutch_words_file_name)))
+    nlp, model_name = get_model()
+    reverso_server, sentence_finder.reverso_api_url = fakes.start_fake_reverso(words)
+    wiktionary_server, shared.wiktionary_api = fakes.start_fake_wiktionary()
+    # the analyzer keeps its model in a global
+    analyzer.lemmatizer_model = nlp
+    context = {"nlp": nlp, "words": words}
+    results = []
+
+    for name in only or benchmarks:
+        result = run_benchmark(name, context, repeat)
+        results.append(result)
+        click.echo(
+            f"{name:<28}{result["best_seconds"] * 1000:>10.1f} ms"
+            f"{result["items_per_second"]:>12.0f} {result["unit"]}/s"
+        )
+
+    reverso_server.shutdown()
+    wiktionary_server.shutdown()
+
+    if output_file is not None:
+        with open(output_file, "w") as file:
+            json.dump(
+                {
+                    "commit": get_commit(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "model": model_name,
+                    "repeat": repeat,
+                    "results": results,
+                },
+                file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    suite()
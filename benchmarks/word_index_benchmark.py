@@ -0,0 +1,80 @@
+import os
+import random
+import tempfile
+import time
+from dutch_frequency_analyzer.word_index import (
+    WordIndex,
+    build_word_index,
+    dutch_words_file_name,
+    read_word_file,
+)
+
+lookup_count = 200_000
+
+
+def load_word_set():
+    words = set()
+
+    with open(dutch_words_file_name) as file:
+        for line in file:
+            words.add(line.strip())
+
+    return words
+
+
+def measure(label, function, repeat=5):
+    best = min(timed(function) for _ in range(repeat))
+    print(f"{label:<40}{best * 1000:>10.2f} ms")
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main():
+    words = list(read_word_file(dutch_words_file_name))
+    stopword_list = words[:101]
+    random.seed(0)
+    queries = [
+        random.choice(words) if random.random() < 0.5 else f"{random.choice(words)}x"
+        for _ in range(lookup_count)
+    ]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index_file_name = os.path.join(temp_dir, "words.idx")
+        stopwords_index_file_name = os.path.join(temp_dir, "stopwords.idx")
+        measure("build index", lambda: build_word_index(words, index_file_name), 1)
+        build_word_index(stopword_list, stopwords_index_file_name)
+
+        word_set = load_word_set()
+        word_index = WordIndex(index_file_name)
+        stopword_index = WordIndex(stopwords_index_file_name)
+
+        print(f"startup ({len(words)} words)")
+        measure("  set from dutch_words.txt", load_word_set)
+        measure("  memory-mapped index", lambda: WordIndex(index_file_name))
+
+        print(f"lookups ({lookup_count} queries)")
+        measure("  set", lambda: sum(query in word_set for query in queries))
+        measure(
+            "  memory-mapped index",
+            lambda: sum(query in word_index for query in queries),
+        )
+
+        print(f"stopword lookups ({lookup_count} queries)")
+        measure(
+            "  list",
+            lambda: sum(query in stopword_list for query in queries),
+            1,
+        )
+        measure(
+            "  memory-mapped index",
+            lambda: sum(query in stopword_index for query in queries),
+            1,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,73 +1,228 @@
 import click
-import nltk
-from nltk.corpus import stopwords
+import csv
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .metrics import instrumented, metrics
 from .shared import (
     get_model,
-    lemmatize,
+    lemmatize_texts,
+    lemmatizer_excluded_components,
     load_known_words,
     load_unknown_words,
     add_known_word,
     justify,
+    spacy_model_name,
 )
+from .lemma_cache import (
+    lemma_cache_key,
+    load_file_digest,
+    load_lemma_counts,
+    store_file_digest,
+    store_lemma_counts,
+)
+from .book_reader import Book, stdin_file_name
+from .word_index import get_stopwords, load_dutch_words
 
-nltk.download("stopwords", quiet=True)
-
-stopword_list = stopwords.words("dutch")
-dutch_words_file_name = "dutch_words.txt"
+lemmatizer_model = None
 
 
 @click.command()
 @click.argument("file-name")
 @click.option("--known-words-file", default="known.txt")
 @click.option("--unknown-words-file", default="unknown.txt")
-def analyzer(file_name, known_words_file, unknown_words_file):
+@click.option("--jobs", default=1, type=click.IntRange(min=1))
+@click.option("--coverage-cutoff", default=0.95, type=click.FloatRange(0, 1))
+@click.option("--frequency-cutoff", default=4, type=click.IntRange(min=0))
+@click.option(
+    "--export",
+    "export_file",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write the ranked frequency table to this file instead of prompting.",
+)
+@click.option(
+    "--export-format",
+    type=click.Choice(("csv", "json"), case_sensitive=False),
+    help="Format of the exported table, guessed from the extension by default.",
+)
+@instrumented
+def analyzer(
+    file_name,
+    known_words_file,
+    unknown_words_file,
+    jobs,
+    coverage_cutoff,
+    frequency_cutoff,
+    export_file,
+    export_format,
+):
+    book_file_names = find_books(file_name)
+
+    if len(book_file_names) == 0:
+        click.echo(f"No books found at {file_name}")
+        return
+
     try:
-        file = open(file_name, "r")
-    except IOError:
-        click.echo(f"Unable to open {file_name}")
+        with metrics.timer("analyzer.count"):
+            if len(book_file_names) == 1:
+                book_lemma_counts = {
+                    book_file_names[0]: get_lemma_counts(book_file_names[0], jobs)
+                }
+            else:
+                book_lemma_counts = get_corpus_lemma_counts(book_file_names, jobs)
+    except IOError as error:
+        click.echo(f"Unable to open {error.filename}")
         return
 
-    nlp = get_model()
     known_words = load_known_words(known_words_file)
     dutch_words = load_dutch_words()
-    word_map = {}
-    total = 0
-    num_lines = sum(1 for _ in open(file_name))
 
-    with file:
-        with click.progressbar(
-            file,
-            label="Analyzing contents",
-            length=num_lines,
-        ) as bar:
-            for line in bar:
-                line = line.lower()
-                for lemma in lemmatize(nlp, line):
-                    lemma = lemma.lower()
-                    if not is_allowed_word(lemma, dutch_words, known_words):
-                        continue
+    with metrics.timer("analyzer.merge"):
+        word_counts, first_seen = count_words(
+            book_lemma_counts, dutch_words, known_words
+        )
 
-                    if lemma not in word_map:
-                        word_map[lemma] = 0
+    ranking = rank_words(
+        word_counts, first_seen, dutch_words, coverage_cutoff, frequency_cutoff
+    )
 
-                    word_map[lemma] += 1
-                    total += 1
+    if export_file is not None:
+        if len(book_lemma_counts) > 1:
+            echo_book_coverage(book_lemma_counts, dutch_words, known_words)
 
-    result_total = 0
-    unknown_words = load_unknown_words(unknown_words_file)
+        if export_format is None:
+            export_format = "json" if export_file.lower().endswith(".json") else "csv"
+
+        # the ranking is sorted lazily, so this includes ranking the words
+        with metrics.timer("analyzer.export"):
+            exported = export_ranking(ranking, export_file, export_format.lower())
 
-    for index, (word, frequency) in enumerate(
-        sorted(
-            word_map.items(),
-            key=lambda entry: entry[1],
-            reverse=True,
+        click.echo(f"Exported {exported} words into {export_file}.")
+        return
+
+    if len(book_lemma_counts) > 1:
+        click.clear()
+        echo_book_coverage(book_lemma_counts, dutch_words, known_words)
+        click.pause()
+
+    review_words(
+        ranking,
+        int((word_counts > 0).sum()),
+        known_words,
+        known_words_file,
+        unknown_words_file,
+    )
+
+
+def count_words(book_lemma_counts, dutch_words, known_words):
+    # Totals the allowed lemmas of every book into an array indexed by their
+    # id in the dictionary index. first_seen holds the position each word was
+    # first counted at, which breaks ties in the ranking.
+
+    # NumPy takes a while to import
+    import numpy as np
+
+    word_counts = np.zeros(len(dutch_words), dtype=np.int64)
+    first_seen = np.full(len(dutch_words), np.iinfo(np.int64).max, dtype=np.int64)
+    word_ids = {}
+    position = 0
+
+    for lemma_counts in book_lemma_counts.values():
+        for lemma in lemma_counts:
+            if lemma not in word_ids:
+                word_ids[lemma] = get_word_id(lemma, dutch_words, known_words)
+
+        ids = np.fromiter(
+            (word_ids[lemma] for lemma in lemma_counts),
+            dtype=np.int64,
+            count=len(lemma_counts),
         )
-    ):
-        if result_total / total > 0.95 or frequency <= 4:
-            return
+        counts = np.fromiter(
+            lemma_counts.values(), dtype=np.int64, count=len(lemma_counts)
+        )
+        allowed = np.flatnonzero(ids >= 0)
+        # the lemmas of a book are distinct, and so are their ids
+        word_counts[ids[allowed]] += counts[allowed]
+        first_seen[ids[allowed]] = np.minimum(
+            first_seen[ids[allowed]], position + allowed
+        )
+        position += len(lemma_counts)
+
+    return (word_counts, first_seen)
 
-        result_total += frequency
 
+def rank_words(word_counts, first_seen, dutch_words, coverage_cutoff, frequency_cutoff):
+    import numpy as np
+
+    ids = np.flatnonzero(word_counts)
+
+    if len(ids) == 0:
+        return
+
+    # most frequent first, and the first counted first among equals
+    ids = ids[np.lexsort((first_seen[ids], -word_counts[ids]))]
+    frequencies = word_counts[ids]
+    cumulative = np.cumsum(frequencies)
+    total = int(cumulative[-1])
+    # the words are taken until the ones before them cover more than the
+    # cutoff, or until they are no more frequent than the frequency cutoff
+    coverage_end = np.searchsorted(
+        (cumulative - frequencies) / total, coverage_cutoff, side="right"
+    )
+    frequency_end = np.searchsorted(-frequencies, -frequency_cutoff, side="left")
+    end = min(coverage_end, frequency_end)
+
+    # converted one word at a time, as the ranking is consumed lazily
+    for index in range(end):
+        yield (
+            index + 1,
+            dutch_words.word(int(ids[index])),
+            int(frequencies[index]),
+            int(cumulative[index]) / total,
+        )
+
+
+def export_ranking(ranking, export_file_name, export_format):
+    fields = ("lemma", "frequency", "rank", "coverage")
+    rows = (
+        {
+            "lemma": word,
+            "frequency": frequency,
+            "rank": rank,
+            "coverage": coverage,
+        }
+        for rank, word, frequency, coverage in ranking
+    )
+    exported = 0
+
+    with open(export_file_name, "w", newline="") as file:
+        match export_format:
+            case "csv":
+                writer = csv.DictWriter(file, fieldnames=fields)
+                writer.writeheader()
+
+                for row in rows:
+                    writer.writerow(row)
+                    exported += 1
+
+            case "json":
+                file.write("[")
+
+                for row in rows:
+                    file.write(",\n " if exported > 0 else "\n ")
+                    json.dump(row, file, ensure_ascii=False)
+                    exported += 1
+
+                file.write("\n]\n")
+
+    return exported
+
+
+def review_words(ranking, num_words, known_words, known_words_file, unknown_words_file):
+    unknown_words = load_unknown_words(unknown_words_file)
+
+    for rank, word, frequency, _ in ranking:
         if word in unknown_words:
             continue
 
@@ -80,7 +235,7 @@ def analyzer(file_name, known_words_file, unknown_words_file):
         click.echo(len(unknown_words))
 
         click.echo("Words found in file:".ljust(justify), nl=False)
-        click.echo(len(word_map))
+        click.echo(num_words)
 
         click.echo()
 
@@ -91,7 +246,7 @@ def analyzer(file_name, known_words_file, unknown_words_file):
         click.echo(frequency)
 
         click.echo("Index:".ljust(justify), nl=False)
-        click.echo(index + 1)
+        click.echo(rank)
 
         click.echo()
 
@@ -115,26 +270,182 @@ def analyzer(file_name, known_words_file, unknown_words_file):
                 return
 
 
+def find_books(path):
+    if os.path.isdir(path):
+        return sorted(
+            entry.path
+            for entry in os.scandir(path)
+            if entry.is_file() and not entry.name.startswith(".")
+        )
+
+    if glob.has_magic(path):
+        return sorted(
+            file_name
+            for file_name in glob.glob(path, recursive=True)
+            if os.path.isfile(file_name)
+        )
+
+    return [path]
+
+
+def get_corpus_lemma_counts(book_file_names, jobs):
+    book_lemma_counts = {}
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(get_lemma_counts, book_file_name): book_file_name
+            for book_file_name in book_file_names
+        }
+
+        with click.progressbar(
+            as_completed(futures),
+            label="Analyzing books",
+            length=len(futures),
+            show_pos=True,
+        ) as bar:
+            for future in bar:
+                book_lemma_counts[futures[future]] = future.result()
+
+    # keep the merged ranking independent of the order the workers finish in
+    return {
+        book_file_name: book_lemma_counts[book_file_name]
+        for book_file_name in book_file_names
+    }
+
+
+def get_lemma_counts(file_name, jobs=None):
+    if file_name != stdin_file_name:
+        content_digest = load_file_digest(file_name)
+
+        if content_digest is not None:
+            cache_key = lemma_cache_key(content_digest, spacy_model_name)
+            lemma_counts = load_lemma_counts(cache_key)
+
+            if lemma_counts is not None:
+                metrics.count("lemma_cache.hits")
+                return lemma_counts
+
+    metrics.count("lemma_cache.misses")
+
+    with Book(file_name) as book:
+        stat = None if file_name == stdin_file_name else os.stat(file_name)
+        lemma_counts = count_lemmas(book, jobs)
+
+        if stat is not None:
+            store_file_digest(file_name, book.digest(), stat)
+            store_lemma_counts(
+                lemma_cache_key(book.digest(), spacy_model_name), lemma_counts
+            )
+
+    return lemma_counts
+
+
+def count_lemmas(book, jobs=None):
+    nlp = get_lemmatizer_model()
+    lemma_counts = {}
+    lines = (line.lower() for line in book.lines())
+
+    # without jobs this runs inside a corpus worker, which shouldn't draw its
+    # own progress bar
+    if jobs is None:
+        for lemmas in lemmatize_texts(nlp, lines):
+            add_lemma_counts(lemma_counts, lemmas)
+
+        return lemma_counts
+
+    lemma_lists = lemmatize_texts(nlp, lines, n_process=jobs)
+
+    # progress is tracked by bytes read, unless the size isn't known upfront
+    if book.size is None:
+        with click.progressbar(
+            lemma_lists,
+            label="Analyzing contents",
+            show_pos=True,
+        ) as bar:
+            for lemmas in bar:
+                add_lemma_counts(lemma_counts, lemmas)
+
+        return lemma_counts
+
+    with click.progressbar(label="Analyzing contents", length=book.size) as bar:
+        for lemmas in lemma_lists:
+            bar.update(book.position - bar.pos)
+            add_lemma_counts(lemma_counts, lemmas)
+
+    return lemma_counts
+
+
+def add_lemma_counts(lemma_counts, lemmas):
+    for lemma in lemmas:
+        lemma = lemma.lower()
+
+        if lemma not in lemma_counts:
+            lemma_counts[lemma] = 0
+
+        lemma_counts[lemma] += 1
+
+
+def get_lemmatizer_model():
+    global lemmatizer_model
+
+    if lemmatizer_model is None:
+        lemmatizer_model = get_model(exclude=lemmatizer_excluded_components)
+
+    return lemmatizer_model
+
+
+def echo_book_coverage(book_lemma_counts, dictionary, known_words):
+    coverages = []
+
+    for book_file_name, lemma_counts in book_lemma_counts.items():
+        total = 0
+        known_total = 0
+        unknown_lemmas = 0
+
+        for lemma, count in lemma_counts.items():
+            if not is_allowed_word(lemma, dictionary, set()):
+                continue
+
+            total += count
+
+            if lemma in known_words:
+                known_total += count
+            else:
+                unknown_lemmas += 1
+
+        coverage = known_total / total if total > 0 else 0.0
+        coverages.append((book_file_name, total, unknown_lemmas, coverage))
+
+    click.echo(f"{'Coverage':>10}{'Words':>10}{'Unknown':>10}  Book (easiest first)")
+
+    for book_file_name, total, unknown_lemmas, coverage in sorted(
+        coverages, key=lambda entry: entry[3], reverse=True
+    ):
+        click.echo(
+            f"{coverage:>10.1%}{total:>10}{unknown_lemmas:>10}  {book_file_name}"
+        )
+
+    click.echo()
+
+
 def add_unknown_word(unknown_words_file_name, word, frequency, unknown_words):
     with open(f"./{unknown_words_file_name}", "a") as f:
         f.write(f"{word} {frequency}\n")
         unknown_words[word] = frequency
 
 
+def get_word_id(word, dictionary, known_words):
+    # the id of an allowed word in the dictionary index, or -1
+    if not word.isalpha() or word in known_words or word in get_stopwords():
+        return -1
+
+    return dictionary.index_of(word)
+
+
 def is_allowed_word(word, dictionary, known_words):
     return (
-        word not in stopword_list
-        and word.isalpha()
+        word.isalpha()
         and word not in known_words
+        and word not in get_stopwords()
         and word in dictionary
     )
-
-
-def load_dutch_words():
-    words = set()
-
-    with open(dutch_words_file_name) as file:
-        for line in file:
-            words.add(line.strip())
-
-    return words
@@ -0,0 +1,119 @@
+import click
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+default_audio_cache_dir = ".audio_cache"
+audio_file_extension = ".mp3"
+
+
+def audio_cache_key(text, voice_name, output_format):
+    return hashlib.sha256(
+        json.dumps([text, voice_name, output_format], ensure_ascii=False).encode()
+    ).hexdigest()
+
+
+class AudioCache:
+    # Synthesized audio stored by a hash of its text, voice and format, so
+    # that a sentence is only synthesized once across output directories.
+    # Files are hard-linked into the output directories where possible.
+
+    def __init__(self, directory=default_audio_cache_dir):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+
+    def fetch(self, key, file_name):
+        cache_file_name = self.__file_name(key)
+
+        try:
+            os.utime(cache_file_name)
+            link_or_copy(cache_file_name, file_name)
+        except FileNotFoundError:
+            with self.__lock:
+                self.misses += 1
+
+            return False
+
+        with self.__lock:
+            self.hits += 1
+
+        return True
+
+    def store(self, key, file_name):
+        cache_file_name = self.__file_name(key)
+        temp_file_name = f"{cache_file_name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(os.path.dirname(cache_file_name), exist_ok=True)
+        link_or_copy(file_name, temp_file_name)
+        os.replace(temp_file_name, cache_file_name)
+
+    def entries(self):
+        # (file name, size, last use) of every cached file
+        for root, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                if not file_name.endswith(audio_file_extension):
+                    continue
+
+                full_file_name = os.path.join(root, file_name)
+                stat = os.stat(full_file_name)
+
+                yield (full_file_name, stat.st_size, stat.st_mtime)
+
+    def prune(self, max_size):
+        # removes the least recently used files until the rest fit max_size
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        size = sum(entry_size for _, entry_size, _ in entries)
+        removed = 0
+
+        for file_name, entry_size, _ in entries:
+            if size <= max_size:
+                break
+
+            os.remove(file_name)
+            size -= entry_size
+            removed += 1
+
+        return (removed, size)
+
+    def __file_name(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}{audio_file_extension}")
+
+
+def link_or_copy(source, destination):
+    if os.path.exists(destination):
+        return
+
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        pass
+    except OSError:
+        # different file systems, or no hard link support
+        shutil.copyfile(source, destination)
+
+
+@click.group()
+def audio_cache():
+    pass
+
+
+@audio_cache.command()
+@click.option("--cache-dir", default=default_audio_cache_dir)
+def stats(cache_dir):
+    entries = list(AudioCache(cache_dir).entries())
+    size = sum(entry_size for _, entry_size, _ in entries)
+    click.echo(
+        f"{len(entries)} audio files, {size / 1024 / 1024:.1f} MB in {cache_dir}."
+    )
+
+
+@audio_cache.command()
+@click.argument("max-size", type=click.FloatRange(min=0))
+@click.option("--cache-dir", default=default_audio_cache_dir)
+def prune(max_size, cache_dir):
+    # max_size is in megabytes
+    removed, size = AudioCache(cache_dir).prune(max_size * 1024 * 1024)
+    click.echo(f"Removed {removed} audio files, {size / 1024 / 1024:.1f} MB left.")
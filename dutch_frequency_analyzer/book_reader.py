@@ -0,0 +1,133 @@
+import bz2
+import gzip
+import hashlib
+import io
+import lzma
+import os
+import posixpath
+import sys
+import urllib.parse
+import zipfile
+
+stdin_file_name = "-"
+book_encoding = "utf-8"
+compressed_openers = {
+    b"\x1f\x8b": gzip.open,
+    b"BZh": bz2.open,
+    b"\xfd7zXZ\x00": lzma.open,
+}
+epub_text_tags = ["h1", "h2", "h3", "h4", "h5", "h6", "p", "li"]
+epub_container_file_name = "META-INF/container.xml"
+
+
+class Book:
+    # Reads a book line by line in a single pass, keeping track of how many
+    # raw bytes were consumed and hashing them on the way.
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.position = 0
+        self.__digest = hashlib.sha256()
+        self.__archive = None
+
+        if file_name == stdin_file_name:
+            self.size = None
+            self.__file = sys.stdin.buffer
+        else:
+            self.__file = open(file_name, "rb")
+            self.size = os.fstat(self.__file.fileno()).st_size
+
+        # progress through an EPUB is counted in the compressed size of its
+        # spine, which callers need to know before reading
+        if file_name.lower().endswith(".epub"):
+            try:
+                self.__archive = zipfile.ZipFile(self.__file)
+                self.__epub_items = [
+                    self.__archive.getinfo(name) for name in epub_spine(self.__archive)
+                ]
+            except Exception:
+                self.close()
+                raise
+
+            self.size = sum(item.compress_size for item in self.__epub_items)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        if self.__archive is not None:
+            self.__archive.close()
+
+        if self.__file is not sys.stdin.buffer:
+            self.__file.close()
+
+    def digest(self):
+        return self.__digest.hexdigest()
+
+    def lines(self):
+        if self.__archive is not None:
+            yield from self.__epub_lines()
+            return
+
+        stream = io.BufferedReader(_CountingReader(self.__file, self))
+
+        for magic, opener in compressed_openers.items():
+            if stream.peek(len(magic))[: len(magic)] == magic:
+                stream = opener(stream)
+                break
+
+        yield from io.TextIOWrapper(stream, encoding=book_encoding, errors="replace")
+
+    def __epub_lines(self):
+        from bs4 import BeautifulSoup
+
+        for item in self.__epub_items:
+            content = self.__archive.read(item)
+            self.__digest.update(content)
+
+            for element in BeautifulSoup(content, "lxml").find_all(epub_text_tags):
+                yield f"{element.get_text().replace("\n", " ")}\n"
+
+            self.position += item.compress_size
+
+    def consume(self, data):
+        self.position += len(data)
+        self.__digest.update(data)
+
+
+class _CountingReader(io.RawIOBase):
+    def __init__(self, file, book):
+        self.__file = file
+        self.__book = book
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.__file.read(len(buffer))
+        buffer[: len(data)] = data
+        self.__book.consume(data)
+
+        return len(data)
+
+
+def epub_spine(archive):
+    from bs4 import BeautifulSoup
+
+    container = BeautifulSoup(archive.read(epub_container_file_name), "xml")
+    package_file_name = container.find("rootfile")["full-path"]
+    package = BeautifulSoup(archive.read(package_file_name), "xml")
+    package_dir = posixpath.dirname(package_file_name)
+    manifest = {
+        item["id"]: posixpath.join(package_dir, urllib.parse.unquote(item["href"]))
+        for item in package.find_all("item")
+    }
+
+    return [
+        manifest[itemref["idref"]]
+        for itemref in package.find_all("itemref")
+        if itemref["idref"] in manifest
+    ]
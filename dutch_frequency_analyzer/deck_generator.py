@@ -1,80 +1,222 @@
 import click
-import genanki
-import random
-import time
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .lemma_cache import write_json_atomically
+from .metrics import instrumented, metrics
 from .shared import load_sentences, term_lookup
 
-template_front_file_name = "assets/front.html"
-template_back_file_name = "assets/back.html"
-template_style_file_name = "assets/style.css"
-
-
-with open(template_front_file_name, "r") as file:
-    front = file.read()
-
-with open(template_back_file_name, "r") as file:
-    back = file.read()
-
-with open(template_style_file_name, "r") as file:
-    style = file.read()
-
+assets_dir_name = os.path.join(os.path.dirname(__file__), "assets")
+template_front_file_name = os.path.join(assets_dir_name, "front.html")
+template_back_file_name = os.path.join(assets_dir_name, "back.html")
+template_style_file_name = os.path.join(assets_dir_name, "style.css")
 model_id = 1553975981
-model = genanki.Model(
-    model_id,
-    "Generated Dutch Sentence",
-    fields=[
-        {"name": "Sentence"},
-        {"name": "Sentence Translation"},
-        {"name": "Word"},
-        {"name": "Word Definition"},
-        {"name": "Sentence Audio"},
-    ],
-    templates=[
-        {
-            "name": "Card 1",
-            "qfmt": front,
-            "afmt": back,
-        }
-    ],
-    css=style,
-)
-
 output_deck_file_name = "out.deck.apkg"
-wiktionary_request_backoff = 0.66  # in seconds
+# what --changed-only writes, so that the full package is left alone
+changed_deck_file_name = "out.deck.changed.apkg"
+# what went into the last deck written to the output directory, so that the
+# next build only has to redo the notes that changed
+deck_manifest_file_name = "out.deck.manifest.json"
+deck_manifest_version = 1
+default_definition_jobs = 8
 
 
 @click.command()
 @click.argument("input-dir")
 @click.argument("deck-name")
 @click.argument("output-dir", default=".")
-def generator(input_dir, deck_name, output_dir):
+@click.option(
+    "--jobs",
+    default=default_definition_jobs,
+    type=click.IntRange(min=1),
+    help="Number of definitions to fetch concurrently.",
+)
+@click.option(
+    "--changed-only",
+    is_flag=True,
+    help=f"Only package notes added or changed since the last build into "
+    f"{changed_deck_file_name}, for importing into a collection that has the "
+    "earlier ones.",
+)
+@click.option(
+    "--full",
+    is_flag=True,
+    help="Fetch every definition again instead of reusing the last build's.",
+)
+@instrumented
+def generator(input_dir, deck_name, output_dir, jobs, changed_only, full):
+    # genanki takes a while to import
+    import genanki
+
+    model = make_note_model()
     sentences = load_sentences(input_dir, extended=True)
+    manifest_file_name = f"{output_dir}/{deck_manifest_file_name}"
+    manifest = {} if full else load_deck_manifest(manifest_file_name, deck_name)
+    fingerprints = {
+        word: note_fingerprint(sentence) for word, sentence in sentences.items()
+    }
+    definitions = {
+        word: manifest[word]["definition"]
+        for word in sentences
+        if word in manifest and manifest[word]["fingerprint"] == fingerprints[word]
+    }
+    changed_words = [word for word in sentences if word not in definitions]
 
-    deck = genanki.Deck(random.randrange(1 << 30, 1 << 31), deck_name)
+    if changed_only and len(changed_words) == 0:
+        click.echo("No notes were added or changed since the last build.")
+        return
+
+    # the same name always gives the same deck, so that importing a rebuilt
+    # deck updates the earlier one instead of adding a second one
+    deck = genanki.Deck(deck_id(deck_name), deck_name)
     package = genanki.Package(deck)
     package.media_files = []
 
-    with click.progressbar(
-        sentences, label="Generating deck", length=len(sentences), show_pos=True
-    ) as bar:
-        for sentence in bar:
-            time.sleep(wiktionary_request_backoff)
-            sentence = sentences[sentence]
-            package.media_files.append(f"{input_dir}/{sentence["audio"]}")
-            deck.add_note(
-                genanki.Note(
-                    model=model,
-                    fields=[
-                        sentence["sentence"],
-                        sentence["translation"],
-                        sentence["word"],
-                        get_definition_html(sentence["word"]),
-                        f"[sound:{sentence["audio"]}]",
-                    ],
-                )
+    # the rate limiter in term_lookup decides how fast requests really go out
+    with metrics.timer("generator.definitions"), ThreadPoolExecutor(
+        max_workers=jobs
+    ) as executor:
+        futures = {
+            executor.submit(get_definition_html, sentences[word]["word"]): word
+            for word in changed_words
+        }
+
+        with click.progressbar(
+            as_completed(futures),
+            label="Generating deck",
+            length=len(futures),
+            show_pos=True,
+        ) as bar:
+            for future in bar:
+                definitions[futures[future]] = future.result()
+
+    metrics.count("generator.notes.changed", len(changed_words))
+    metrics.count("generator.notes.reused", len(sentences) - len(changed_words))
+
+    for word in changed_words if changed_only else sentences:
+        sentence = sentences[word]
+        package.media_files.append(f"{input_dir}/{sentence["audio"]}")
+        deck.add_note(
+            genanki.Note(
+                model=model,
+                fields=[
+                    sentence["sentence"],
+                    sentence["translation"],
+                    sentence["word"],
+                    definitions[word],
+                    f"[sound:{sentence["audio"]}]",
+                ],
+                # a note keeps its GUID when its sentence is replaced, so
+                # Anki updates it rather than adding a duplicate
+                guid=genanki.guid_for(sentence["word"]),
             )
+        )
+
+    deck_file_name = os.path.join(
+        output_dir, changed_deck_file_name if changed_only else output_deck_file_name
+    )
+
+    with metrics.timer("generator.package"):
+        package.write_to_file(deck_file_name)
+
+    write_json_atomically(
+        manifest_file_name,
+        {
+            "version": deck_manifest_version,
+            "deck_name": deck_name,
+            "notes": {
+                word: {
+                    "fingerprint": fingerprints[word],
+                    "definition": definitions[word],
+                }
+                for word in sentences
+            },
+        },
+    )
+
+    click.echo(
+        f"Packaged {len(deck.notes)} notes into {deck_file_name}, "
+        f"{len(changed_words)} of them new or changed."
+    )
+
+
+def deck_id(deck_name):
+    # in the same range genanki suggests for random deck IDs
+    digest = hashlib.sha256(deck_name.encode()).digest()
+
+    return (1 << 30) + int.from_bytes(digest[:8]) % (1 << 30)
+
+
+def note_fingerprint(sentence):
+    # audio file names are derived from the synthesized text, so a changed
+    # recording also changes the fingerprint
+    return hashlib.sha256(
+        json.dumps(
+            [
+                sentence["word"],
+                sentence["sentence"],
+                sentence["translation"],
+                sentence["audio"],
+            ],
+            ensure_ascii=False,
+        ).encode()
+    ).hexdigest()
+
+
+def load_deck_manifest(file_name, deck_name):
+    try:
+        file = open(file_name)
+    except IOError:
+        return {}
+
+    with file:
+        try:
+            manifest = json.load(file)
+        except ValueError:
+            return {}
+
+    # a manifest of another deck says nothing about what this one has
+    if (
+        manifest.get("version") != deck_manifest_version
+        or manifest.get("deck_name") != deck_name
+    ):
+        return {}
+
+    return manifest["notes"]
+
+
+def make_note_model():
+    import genanki
+
+    with open(template_front_file_name, "r") as file:
+        front = file.read()
+
+    with open(template_back_file_name, "r") as file:
+        back = file.read()
+
+    with open(template_style_file_name, "r") as file:
+        style = file.read()
 
-    package.write_to_file(f"{output_dir}/out.deck.apkg")
+    return genanki.Model(
+        model_id,
+        "Generated Dutch Sentence",
+        fields=[
+            {"name": "Sentence"},
+            {"name": "Sentence Translation"},
+            {"name": "Word"},
+            {"name": "Word Definition"},
+            {"name": "Sentence Audio"},
+        ],
+        templates=[
+            {
+                "name": "Card 1",
+                "qfmt": front,
+                "afmt": back,
+            }
+        ],
+        css=style,
+    )
 
 
 def get_definition_html(term):
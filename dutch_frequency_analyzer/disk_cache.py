@@ -0,0 +1,120 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class DiskCache:
+    # A key-value store of JSON values in a SQLite database. Entries expire
+    # after `ttl` seconds, and once the stored values exceed `max_size` bytes
+    # the least recently used ones are evicted. The database runs in WAL mode,
+    # so several processes can share one cache file.
+
+    def __init__(self, file_name, ttl=None, max_size=None):
+        self.file_name = file_name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(
+            file_name, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """)
+        self.__connection.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+        )
+
+    def get(self, key, default=None):
+        now = time.time()
+
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self.__connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return default
+
+            self.__connection.execute(
+                "UPDATE entries SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def __contains__(self, key):
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+        return row is not None and (
+            self.ttl is None or time.time() - row[0] <= self.ttl
+        )
+
+    def set(self, key, value):
+        encoded = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now, now),
+            )
+
+            if self.max_size is not None:
+                self.__evict()
+
+    def size(self):
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()[0]
+
+    def clear(self):
+        with self.__lock:
+            self.__connection.execute("DELETE FROM entries")
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+    def __evict(self):
+        excess = (
+            self.__connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()[0]
+            - self.max_size
+        )
+
+        if excess <= 0:
+            return
+
+        evicted_keys = []
+
+        for key, size in self.__connection.execute(
+            "SELECT key, size FROM entries ORDER BY accessed"
+        ):
+            evicted_keys.append((key,))
+            excess -= size
+
+            if excess <= 0:
+                break
+
+        self.__connection.executemany("DELETE FROM entries WHERE key = ?", evicted_keys)
@@ -0,0 +1,134 @@
+import click
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+default_known_words_file_name = "known.txt"
+
+
+# The known words file is an append-only log with one word per line. Every
+# read and write happens under a lock file next to it rather than a lock on
+# the file itself, so compaction can swap the file out safely.
+@contextmanager
+def known_words_lock(known_words_file_name, exclusive):
+    if fcntl is None:
+        yield
+        return
+
+    with open(f"{known_words_file_name}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_known_words(known_words_file_name):
+    if not os.path.exists(known_words_file_name):
+        return set()
+
+    with known_words_lock(known_words_file_name, exclusive=False):
+        return read_known_words(known_words_file_name)
+
+
+def read_known_words(known_words_file_name):
+    try:
+        file = open(known_words_file_name)
+    except IOError:
+        return set()
+
+    with file:
+        known_words = {line.strip() for line in file}
+
+    known_words.discard("")
+
+    return known_words
+
+
+def add_known_word(known_words_file_name, word, known_words):
+    add_known_words(known_words_file_name, [word], known_words)
+
+
+def add_known_words(known_words_file_name, words, known_words):
+    new_words = [word for word in dict.fromkeys(words) if word not in known_words]
+
+    if len(new_words) == 0:
+        return 0
+
+    data = "".join(f"{word}\n" for word in new_words).encode()
+
+    with known_words_lock(known_words_file_name, exclusive=True):
+        with open(known_words_file_name, "a+b") as file:
+            # a crash in the middle of an earlier write could have left an
+            # unterminated line behind
+            if file.seek(0, os.SEEK_END) > 0:
+                file.seek(-1, os.SEEK_END)
+
+                if file.read(1) != b"\n":
+                    data = b"\n" + data
+
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+
+    known_words.update(new_words)
+
+    return len(new_words)
+
+
+def compact_known_words(known_words_file_name):
+    with known_words_lock(known_words_file_name, exclusive=True):
+        known_words = read_known_words(known_words_file_name)
+        write_known_words(known_words_file_name, known_words)
+
+    return len(known_words)
+
+
+def write_known_words(file_name, known_words):
+    temp_file_name = f"{file_name}.{os.getpid()}.tmp"
+
+    with open(temp_file_name, "w") as file:
+        for word in sorted(known_words):
+            file.write(f"{word}\n")
+
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(temp_file_name, file_name)
+
+
+@click.group()
+def known_words():
+    pass
+
+
+@known_words.command("import")
+@click.argument("text-file")
+@click.option("--known-words-file", default=default_known_words_file_name)
+def import_known_words(text_file, known_words_file):
+    known_words = load_known_words(known_words_file)
+    new_words = add_known_words(
+        known_words_file, sorted(read_known_words(text_file)), known_words
+    )
+    click.echo(f"Added {new_words} words into the known words file.")
+
+
+@known_words.command("export")
+@click.argument("text-file")
+@click.option("--known-words-file", default=default_known_words_file_name)
+def export_known_words(text_file, known_words_file):
+    known_words = load_known_words(known_words_file)
+    write_known_words(text_file, known_words)
+    click.echo(f"Exported {len(known_words)} words into {text_file}.")
+
+
+@known_words.command("compact")
+@click.option("--known-words-file", default=default_known_words_file_name)
+def compact(known_words_file):
+    word_count = compact_known_words(known_words_file)
+    click.echo(f"Compacted the known words file down to {word_count} words.")
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from .shared import get_model_version
+
+lemma_cache_dir_name = ".lemma_cache"
+digest_memo_dir_name = f"{lemma_cache_dir_name}/digests"
+
+
+# Content digests are computed while a book is being analyzed, so they are
+# remembered per path, size and modification time to find the cached counts
+# again without reading the book up front.
+def load_file_digest(file_name):
+    try:
+        stat = os.stat(file_name)
+        file = open(digest_memo_file_name(file_name))
+    except IOError:
+        return None
+
+    with file:
+        try:
+            memo = json.load(file)
+        except ValueError:
+            return None
+
+    if memo["size"] != stat.st_size or memo["mtime"] != stat.st_mtime_ns:
+        return None
+
+    return memo["digest"]
+
+
+def store_file_digest(file_name, content_digest, stat):
+    Path(digest_memo_dir_name).mkdir(parents=True, exist_ok=True)
+    write_json_atomically(
+        digest_memo_file_name(file_name),
+        {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "digest": content_digest,
+        },
+    )
+
+
+def digest_memo_file_name(file_name):
+    path_digest = hashlib.sha256(os.path.realpath(file_name).encode()).hexdigest()
+
+    return f"{digest_memo_dir_name}/{path_digest}.json"
+
+
+def lemma_cache_key(content_digest, model_name):
+    model_version = get_model_version(model_name)
+
+    if model_version is None:
+        return None
+
+    return f"{content_digest}-{model_name}-{model_version}"
+
+
+def load_lemma_counts(cache_key):
+    if cache_key is None:
+        return None
+
+    try:
+        file = open(f"{lemma_cache_dir_name}/{cache_key}.json")
+    except IOError:
+        return None
+
+    with file:
+        try:
+            return json.load(file)
+        except ValueError:
+            return None
+
+
+def store_lemma_counts(cache_key, lemma_counts):
+    if cache_key is None:
+        return
+
+    Path(lemma_cache_dir_name).mkdir(parents=True, exist_ok=True)
+    write_json_atomically(f"{lemma_cache_dir_name}/{cache_key}.json", lemma_counts)
+
+
+def write_json_atomically(file_name, data):
+    temp_file_name = f"{file_name}.{os.getpid()}.tmp"
+
+    with open(temp_file_name, "w") as file:
+        json.dump(data, file, ensure_ascii=False)
+
+    os.replace(temp_file_name, file_name)
@@ -0,0 +1,254 @@
+import click
+import getpass
+import itertools
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+from collections import namedtuple
+
+# components that can be left out without changing lemmas
+lemmatizer_excludable_components = ("parser", "ner")
+lemmatizer_request_batch_size = 256
+# what pipe() yields for every token, in place of a spaCy token
+LemmatizedToken = namedtuple("LemmatizedToken", ("lemma_", "text"))
+
+
+def get_lemmatizer_socket_file_name():
+    # the socket lives in a directory only its user can get into, so that no
+    # one else can put a server of their own in its place. Worked out when
+    # needed rather than on import, as finding the user can fail
+    if os.environ.get("LEMMATIZER_SOCKET"):
+        return os.environ["LEMMATIZER_SOCKET"]
+
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(
+            os.environ["XDG_RUNTIME_DIR"], "dutch-frequency-analyzer.sock"
+        )
+
+    try:
+        user = getpass.getuser()
+    except (KeyError, OSError):
+        # no login name and no passwd entry, as in some containers
+        user = str(os.getuid())
+
+    return os.path.join(
+        tempfile.gettempdir(), f"dutch-frequency-analyzer-{user}", "lemmatizer.sock"
+    )
+
+
+class LemmatizerClient:
+    # Stands in for a spaCy model by sending texts to a running lemmatizer
+    # server. Only pipe() is supported, and its tokens only have lemma_ and
+    # text, which is all the lemmatize functions in shared use.
+
+    def __init__(self, socket_file_name):
+        self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            self.__socket.connect(socket_file_name)
+        except OSError:
+            self.__socket.close()
+            raise
+
+        self.__file = self.__socket.makefile("rwb")
+        self.__lock = threading.Lock()
+        self.info = self.__request({"info": True})
+
+    def pipe(self, texts, batch_size=lemmatizer_request_batch_size, n_process=1):
+        texts = iter(texts)
+
+        # the server has its own batching, so the batch size here only sets
+        # how many texts go in one request
+        for batch in iter(lambda: list(itertools.islice(texts, batch_size)), []):
+            for doc in self.__request({"texts": batch})["docs"]:
+                yield [LemmatizedToken(lemma, text) for lemma, text in doc]
+
+    def close(self):
+        self.__file.close()
+        self.__socket.close()
+
+    def __request(self, request):
+        with self.__lock:
+            self.__file.write(json.dumps(request, ensure_ascii=False).encode())
+            self.__file.write(b"\n")
+            self.__file.flush()
+            line = self.__file.readline()
+
+        if line == b"":
+            raise ConnectionError("The lemmatizer server closed the connection.")
+
+        response = json.loads(line)
+
+        if "error" in response:
+            raise Exception(f"Lemmatizer server error: {response["error"]}")
+
+        return response
+
+
+def connect_lemmatizer(model_name, socket_file_name=None):
+    # returns None unless a server with the same model is running
+    if socket_file_name is None:
+        socket_file_name = get_lemmatizer_socket_file_name()
+
+    if not hasattr(socket, "AF_UNIX") or not is_trusted_socket(socket_file_name):
+        return None
+
+    try:
+        client = LemmatizerClient(socket_file_name)
+    except OSError:
+        return None
+
+    if client.info["model"] != model_name:
+        client.close()
+        return None
+
+    return client
+
+
+def is_trusted_socket(socket_file_name):
+    # a socket of this user, in a directory where no one else can have
+    # replaced it
+    if not hasattr(os, "getuid"):
+        return False
+
+    try:
+        socket_stat = os.lstat(socket_file_name)
+        dir_stat = os.stat(os.path.dirname(os.path.abspath(socket_file_name)))
+    except OSError:
+        return False
+
+    return (
+        stat.S_ISSOCK(socket_stat.st_mode)
+        and socket_stat.st_uid == os.getuid()
+        and is_trusted_dir(dir_stat)
+    )
+
+
+def is_trusted_dir(dir_stat):
+    # others can't swap files in a sticky directory like /tmp either
+    return dir_stat.st_uid in (0, os.getuid()) and (
+        dir_stat.st_mode & 0o022 == 0 or dir_stat.st_mode & stat.S_ISVTX != 0
+    )
+
+
+class LemmatizerRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+
+                if "info" in request:
+                    response = self.server.info
+                else:
+                    response = {"docs": self.server.lemmatize(request["texts"])}
+            except Exception as exception:
+                response = {"error": str(exception)}
+
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode())
+            self.wfile.write(b"\n")
+
+
+class LemmatizerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_file_name, nlp, info):
+        super().__init__(socket_file_name, LemmatizerRequestHandler)
+        self.nlp = nlp
+        self.info = info
+        # spaCy models aren't meant to be shared between threads
+        self.__lock = threading.Lock()
+
+    def lemmatize(self, texts):
+        with self.__lock:
+            return [
+                [(token.lemma_, token.text) for token in doc]
+                for doc in self.nlp.pipe(texts)
+            ]
+
+
+@click.command()
+@click.option(
+    "--model-size",
+    type=click.Choice(("sm", "md", "lg")),
+    help="Defaults to SPACY_MODEL_SIZE, or lg if that isn't set.",
+)
+@click.option(
+    "--exclude",
+    multiple=True,
+    type=click.Choice(lemmatizer_excludable_components),
+    help="Pipeline component to leave out, can be given more than once. Only "
+    "components that don't change lemmas can be left out.",
+)
+@click.option(
+    "--socket",
+    "socket_file_name",
+    help="Defaults to LEMMATIZER_SOCKET, or a socket in XDG_RUNTIME_DIR or in a "
+    "directory of this user in the temporary directory.",
+)
+def lemmatizer_server(model_size, exclude, socket_file_name):
+    from .shared import (
+        get_model_version,
+        lemmatizer_excluded_components,
+        load_spacy_model,
+        spacy_model_name,
+    )
+
+    model_name = (
+        spacy_model_name if model_size is None else f"nl_core_news_{model_size}"
+    )
+
+    if socket_file_name is None:
+        socket_file_name = get_lemmatizer_socket_file_name()
+
+    socket_dir_name = os.path.dirname(os.path.abspath(socket_file_name))
+    os.makedirs(socket_dir_name, mode=0o700, exist_ok=True)
+
+    if not is_trusted_dir(os.stat(socket_dir_name)):
+        raise click.ClickException(
+            f"{socket_dir_name} can be written to by other users, put the socket "
+            "somewhere private with --socket or LEMMATIZER_SOCKET."
+        )
+
+    if os.path.lexists(socket_file_name):
+        if not is_trusted_socket(socket_file_name):
+            raise click.ClickException(
+                f"{socket_file_name} exists and doesn't belong to this user."
+            )
+
+        try:
+            LemmatizerClient(socket_file_name).close()
+            click.echo(
+                f"A lemmatizer server is already listening on {socket_file_name}."
+            )
+            return
+        except OSError:
+            # left behind by a server that didn't shut down cleanly
+            os.remove(socket_file_name)
+
+    exclude = list(exclude) if len(exclude) > 0 else lemmatizer_excluded_components
+    nlp = load_spacy_model(model_name, exclude=exclude)
+    info = {
+        "model": model_name,
+        "version": get_model_version(model_name),
+        "exclude": exclude,
+    }
+
+    # stopping the server cleanly removes its socket file
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    with LemmatizerServer(socket_file_name, nlp, info) as server:
+        os.chmod(socket_file_name, 0o600)
+        click.echo(f"Serving {model_name} on {socket_file_name}.")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_file_name)
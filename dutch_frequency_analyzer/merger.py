@@ -1,25 +1,28 @@
 import click
-from .shared import get_model, lemmatize, load_known_words, add_known_word
+from .metrics import instrumented, metrics
+from .shared import get_model, lemmatize, load_known_words, add_known_words
 
 
 @click.command()
 @click.argument("deck-file")
 @click.argument("known-words-file")
+@instrumented
 def merger(deck_file, known_words_file):
     nlp = get_model()
 
     sentences = load_deck_sentences(deck_file)
     known_words = load_known_words(known_words_file)
-    new_words = 0
+    lemmas = []
 
-    for sentence in sentences:
-        for lemma in lemmatize(nlp, sentence):
-            if not lemma.isalpha():
-                continue
+    with metrics.timer("merger.lemmatize"):
+        for sentence in sentences:
+            for lemma in lemmatize(nlp, sentence):
+                if not lemma.isalpha():
+                    continue
+
+                lemmas.append(lemma)
 
-            if lemma not in known_words:
-                add_known_word(known_words_file, lemma, known_words)
-                new_words += 1
+    new_words = add_known_words(known_words_file, lemmas, known_words)
 
     click.echo(f"Added {new_words} words into the known words file.")
 
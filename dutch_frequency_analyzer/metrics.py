@@ -0,0 +1,136 @@
+import click
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Metrics:
+    # Wall time and counters of the stages of a run, collected from every
+    # thread. Timers keep their count, total and slowest duration, and the
+    # requests to each service are timed as <service>.request.
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+        # caches with hits and misses attributes, read when the records are
+        # written
+        self.caches = {}
+        self.__lock = threading.Lock()
+
+    def add_time(self, name, seconds):
+        with self.__lock:
+            count, total, slowest = self.timers.get(name, (0, 0.0, 0.0))
+            self.timers[name] = (count + 1, total + seconds, max(slowest, seconds))
+
+    def count(self, name, amount=1):
+        with self.__lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def watch_cache(self, name, cache):
+        with self.__lock:
+            self.caches[name] = cache
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def records(self):
+        with self.__lock:
+            timers = dict(self.timers)
+            counters = dict(self.counters)
+            caches = dict(self.caches)
+
+        for name, (count, total, slowest) in sorted(timers.items()):
+            yield {
+                "type": "timer",
+                "name": name,
+                "count": count,
+                "total_seconds": total,
+                "mean_seconds": total / count,
+                "max_seconds": slowest,
+            }
+
+        for name, value in sorted(counters.items()):
+            yield {"type": "counter", "name": name, "value": value}
+
+        for name, cache in sorted(caches.items()):
+            lookups = cache.hits + cache.misses
+            yield {
+                "type": "cache",
+                "name": name,
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "hit_rate": cache.hits / lookups if lookups > 0 else None,
+            }
+
+        if "lemmatize" in timers and timers["lemmatize"][1] > 0:
+            yield {
+                "type": "rate",
+                "name": "lemmatized_tokens_per_second",
+                "value": counters.get("lemmatize.tokens", 0) / timers["lemmatize"][1],
+            }
+
+
+metrics = Metrics()
+
+
+def write_metrics(file_name, command_name, started, wall_seconds):
+    run = {"command": command_name, "started": started}
+
+    with open(file_name, "a") as file:
+        file.write(
+            json.dumps({**run, "type": "run", "wall_seconds": wall_seconds}) + "\n"
+        )
+
+        for record in metrics.records():
+            file.write(json.dumps({**run, **record}) + "\n")
+
+
+# Adds --metrics and --profile to a click command. Goes right above the
+# function, below the other options.
+def instrumented(function):
+    @click.option(
+        "--metrics",
+        "metrics_file",
+        help="Append the timings and counters of this run to a JSON lines file.",
+    )
+    @click.option(
+        "--profile",
+        "profile_file",
+        help="Write a cProfile profile of the main thread to this file.",
+    )
+    @functools.wraps(function)
+    def wrapper(*args, metrics_file, profile_file, **kwargs):
+        started = time.time()
+        start = time.perf_counter()
+        profile = None
+
+        if profile_file is not None:
+            import cProfile
+
+            profile = cProfile.Profile()
+            profile.enable()
+
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(profile_file)
+
+            if metrics_file is not None:
+                write_metrics(
+                    metrics_file,
+                    function.__name__,
+                    started,
+                    time.perf_counter() - start,
+                )
+
+    return wrapper
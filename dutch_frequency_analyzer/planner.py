@@ -0,0 +1,119 @@
+import heapq
+from collections import defaultdict
+
+
+# Orders the words so that as many of them as possible get a sentence with no
+# other unknown word in it. Every word has a few candidate sentences, given by
+# their lemmas, and a sentence of a word is blocked by its other lemmas that
+# are neither known nor planned before the word yet. Words whose sentence
+# isn't blocked anymore are planned first, in the original order. When there
+# are none, the word that unblocks the most other words is planned next.
+def plan_word_order(words, sentence_lemmas, is_known):
+    word_indices = {word: index for index, word in enumerate(words)}
+    # the number of lemmas still blocking each (word, sentence) pair
+    blocker_counts = []
+    blockers = []
+    pair_words = []
+    blocked_pairs = defaultdict(list)
+    # words that are ready to get a sentence, by their original index
+    ready = []
+    is_ready = [False] * len(words)
+
+    for word_index, word in enumerate(words):
+        for lemmas in sentence_lemmas(word):
+            pair_blockers = {
+                lemma for lemma in lemmas if lemma != word and not is_known(lemma)
+            }
+
+            if len(pair_blockers) == 0:
+                if not is_ready[word_index]:
+                    is_ready[word_index] = True
+                    ready.append(word_index)
+
+                continue
+
+            # sentences blocked by words that are never going to be planned
+            # can't become usable
+            if any(lemma not in word_indices for lemma in pair_blockers):
+                continue
+
+            pair_index = len(pair_words)
+            pair_words.append(word_index)
+            blockers.append(pair_blockers)
+            blocker_counts.append(len(pair_blockers))
+
+            for lemma in pair_blockers:
+                blocked_pairs[word_indices[lemma]].append(pair_index)
+
+    heapq.heapify(ready)
+    is_planned = [False] * len(words)
+    # the words each word would make ready, if it was planned next
+    unlocks = [set() for _ in words]
+
+    for pair_index, count in enumerate(blocker_counts):
+        if count == 1:
+            (blocker,) = blockers[pair_index]
+            unlocks[word_indices[blocker]].add(pair_words[pair_index])
+
+    gains = [
+        (-len(unlocks[word_index]), word_index) for word_index in range(len(words))
+    ]
+    heapq.heapify(gains)
+    order = []
+
+    while len(order) < len(words):
+        if len(ready) > 0:
+            word_index = heapq.heappop(ready)
+
+            if is_planned[word_index]:
+                continue
+        else:
+            word_index = pop_best_gain(gains, unlocks, is_planned, is_ready)
+
+        is_planned[word_index] = True
+        order.append(words[word_index])
+
+        for pair_index in blocked_pairs.pop(word_index, ()):
+            blocker_counts[pair_index] -= 1
+            pair_word_index = pair_words[pair_index]
+
+            if is_planned[pair_word_index] or is_ready[pair_word_index]:
+                continue
+
+            if blocker_counts[pair_index] == 0:
+                is_ready[pair_word_index] = True
+                heapq.heappush(ready, pair_word_index)
+            elif blocker_counts[pair_index] == 1:
+                (blocker,) = (
+                    lemma
+                    for lemma in blockers[pair_index]
+                    if not is_planned[word_indices[lemma]]
+                )
+                blocker_index = word_indices[blocker]
+                unlocks[blocker_index].add(pair_word_index)
+                heapq.heappush(gains, (-len(unlocks[blocker_index]), blocker_index))
+
+    return order
+
+
+def pop_best_gain(gains, unlocks, is_planned, is_ready):
+    # gains only grow through new heap entries, so stale entries are
+    # recounted and pushed back until the best one is up to date
+    while True:
+        negative_gain, word_index = heapq.heappop(gains)
+
+        if is_planned[word_index]:
+            continue
+
+        unlocks[word_index] = {
+            unlocked_index
+            for unlocked_index in unlocks[word_index]
+            if not is_planned[unlocked_index] and not is_ready[unlocked_index]
+        }
+        gain = len(unlocks[word_index])
+
+        if gain < -negative_gain:
+            heapq.heappush(gains, (-gain, word_index))
+            continue
+
+        return word_index
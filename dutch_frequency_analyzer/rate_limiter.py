@@ -0,0 +1,51 @@
+import threading
+import time
+
+
+class RateLimiter:
+    # A token bucket whose refill rate adapts to the server: every successful
+    # request raises it by `increase` requests per second up to `max_rate`,
+    # while a throttled one halves it down to `min_rate` and, if the server
+    # said so, pauses all requests for a while.
+
+    def __init__(self, rate, max_rate, min_rate, burst=1, increase=0.5):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.increase = increase
+        self.__tokens = burst
+        self.__updated = time.monotonic()
+        self.__paused_until = 0.0
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.__lock:
+                now = time.monotonic()
+                self.__tokens = min(
+                    self.burst, self.__tokens + (now - self.__updated) * self.rate
+                )
+                self.__updated = now
+
+                if now >= self.__paused_until and self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+
+                delay = max(self.__paused_until - now, (1 - self.__tokens) / self.rate)
+
+            time.sleep(delay)
+
+    def succeeded(self):
+        with self.__lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def throttled(self, retry_after=None):
+        with self.__lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.__tokens = min(self.__tokens, 0)
+
+            if retry_after is not None:
+                self.__paused_until = max(
+                    self.__paused_until, time.monotonic() + retry_after
+                )
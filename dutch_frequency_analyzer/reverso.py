@@ -27,14 +27,22 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from collections import namedtuple
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import json
 
 from bs4 import BeautifulSoup
 import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import metrics
 
 __all__ = ["ReversoContextAPI", "WordUsageExample", "Translation", "InflectedForm"]
 
+API_URL = "https://context.reverso.net/bst-query-service"
+
+DEFAULT_LOOKAHEAD = 4
+
 HEADERS = {
     "User-Agent": "Mozilla/5.2",
     "Content-Type": "application/json; charset=UTF-8",
@@ -59,16 +67,45 @@ class ReversoContextAPI(object):
         source_lang
         target_lang
         page_count
+        api_url
+        lookahead
+        cache
 
     Methods:
         get_translations()
         get_examples()
+        get_example_pages()
 
     """
 
     def __init__(
-        self, source_text="пример", target_text="", source_lang="ru", target_lang="en"
+        self,
+        source_text="пример",
+        target_text="",
+        source_lang="ru",
+        target_lang="en",
+        session=None,
+        api_url=API_URL,
+        lookahead=DEFAULT_LOOKAHEAD,
+        cache=None,
     ):
+        """
+        Args:
+            session: A requests.Session to send the requests with. A new session with a connection pool large enough
+                for the lookahead is created when none is given, so that pages are fetched over keep-alive connections.
+            api_url: The URL of the query service, can be pointed to a local stand-in server.
+            lookahead: How many pages get_examples() fetches concurrently ahead of the page being consumed.
+            cache: A DiskCache for the responses, keyed by the source text, the language pair and the page number.
+        """
+        self.api_url = api_url
+        self.lookahead = lookahead
+        self.cache = cache
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=max(lookahead, 1))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.__session = session
         (
             self.__source_text,
             self.__target_text,
@@ -96,14 +133,39 @@ class ReversoContextAPI(object):
     @property
     def page_count(self):
         if self.__info_modified:
-            self.__page_count = requests.post(
-                "https://context.reverso.net/bst-query-service",
-                headers=HEADERS,
-                data=json.dumps(self.__data),
-            ).json()["npages"]
+            self.__page_count = self.__query()["npages"]
             self.__info_modified = False
         return self.__page_count
 
+    def __query(self, npage=None):
+        data = dict(self.__data)
+        if npage is not None:
+            data["npage"] = npage
+        # the service answers with the first page when no page is given
+        cache_key = json.dumps(
+            [
+                self.source_text,
+                self.target_text,
+                self.source_lang,
+                self.target_lang,
+                npage or 1,
+            ],
+            ensure_ascii=False,
+        )
+        if self.cache is not None:
+            cached_response = self.cache.get(cache_key)
+            if cached_response is not None:
+                return cached_response
+        with metrics.timer("reverso.request"):
+            response = self.__session.post(
+                self.api_url, headers=HEADERS, data=json.dumps(data)
+            )
+        response.raise_for_status()
+        response_json = response.json()
+        if self.cache is not None:
+            self.cache.set(cache_key, response_json)
+        return response_json
+
     @property
     def source_text(self):
         return self.__source_text
@@ -169,11 +231,7 @@ class ReversoContextAPI(object):
 
         """
 
-        translations_json = requests.post(
-            "https://context.reverso.net/bst-query-service",
-            headers=HEADERS,
-            data=json.dumps(self.__data),
-        ).json()["dictionary_entry_list"]
+        translations_json = self.__query()["dictionary_entry_list"]
         for translation in translations_json:
             yield Translation(
                 self.__data["source_text"],
@@ -189,13 +247,31 @@ class ReversoContextAPI(object):
     def get_examples(self):
         """A generator that gets words' usage examples pairs from server pair by pair.
 
+        See get_example_pages() for how the pages are fetched.
+
+        Yields:
+            Tuples with two WordUsageExample namedtuples (for source and target text and highlighted indexes)
+
+        """
+
+        for examples in self.get_example_pages():
+            yield from examples
+
+    def get_example_pages(self):
+        """A generator that gets words' usage examples pairs from server page by page.
+
         Note:
             Don't try to get all usage examples at one time if there are more than 5 pages (see the page_count attribute). It
             may take a long time to complete because it will be necessary to connect to the server as many times as there are pages exist.
             Just get the usage examples one by one as they are being fetched.
 
+            The first page also carries the page count, so no separate request is made for it. Up to `lookahead` of the
+            following pages are fetched concurrently in the background, but the examples are still yielded in page order.
+            Pages that are still pending when the generator is closed are cancelled.
+
         Yields:
-            Tuples with two WordUsageExample namedtuples (for source and target text and highlighted indexes)
+            Lists of tuples with two WordUsageExample namedtuples (for source and target text and highlighted indexes),
+            one list per page.
 
         """
 
@@ -225,17 +301,45 @@ class ReversoContextAPI(object):
                 cur += len(t)
             return idxs
 
-        for npage in range(1, self.page_count + 1):  # type: ignore
-            self.__data["npage"] = npage  # type: ignore
-            examples_json = requests.post(
-                "https://context.reverso.net/bst-query-service",
-                headers=HEADERS,
-                data=json.dumps(self.__data),
-            ).json()["list"]
+        for examples_json in self.__get_pages():
+            examples = []
             for word in examples_json:
                 source = BeautifulSoup(word["s_text"], features="lxml")
                 target = BeautifulSoup(word["t_text"], features="lxml")
-                yield (
-                    WordUsageExample(source.text, find_highlighted_idxs(source)),
-                    WordUsageExample(target.text, find_highlighted_idxs(target)),
+                examples.append(
+                    (
+                        WordUsageExample(source.text, find_highlighted_idxs(source)),
+                        WordUsageExample(target.text, find_highlighted_idxs(target)),
+                    )
                 )
+            yield examples
+
+    def __get_pages(self):
+        first_page = self.__query(1)
+        self.__page_count = first_page["npages"]
+        self.__info_modified = False
+        yield first_page["list"]
+
+        if self.lookahead < 1:
+            for npage in range(2, self.__page_count + 1):
+                yield self.__query(npage)["list"]
+            return
+
+        pages = iter(range(2, self.__page_count + 1))
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=self.lookahead)
+
+        try:
+            for npage in pages:
+                pending.append(executor.submit(self.__query, npage))
+                if len(pending) >= self.lookahead:
+                    break
+
+            while pending:
+                examples_json = pending.popleft().result()["list"]
+                for npage in pages:
+                    pending.append(executor.submit(self.__query, npage))
+                    break
+                yield examples_json
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
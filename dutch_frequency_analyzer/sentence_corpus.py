@@ -0,0 +1,263 @@
+import click
+import itertools
+import json
+import sqlite3
+from .book_reader import Book
+from .shared import (
+    get_model,
+    lemmatize_and_map_texts,
+    lemmatizer_excluded_components,
+)
+
+default_corpus_file_name = "corpus.db"
+corpus_import_batch_size = 1000
+# how many of the shortest sentences containing a word are looked at when
+# there aren't enough with only the word unknown
+corpus_scan_limit = 2000
+corpus_candidate_limit = 100
+
+
+class SentenceCorpus:
+    # A local parallel corpus, stored in SQLite with every sentence
+    # lemmatized upfront and an inverted index from lemmas to sentences.
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.__connection = sqlite3.connect(file_name, check_same_thread=False)
+        self.__connection.executescript("""
+            CREATE TABLE IF NOT EXISTS lemmas (
+                id INTEGER PRIMARY KEY,
+                lemma TEXT NOT NULL UNIQUE
+            );
+            CREATE TABLE IF NOT EXISTS sentences (
+                id INTEGER PRIMARY KEY,
+                sentence TEXT NOT NULL UNIQUE,
+                translation TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                tokens TEXT NOT NULL,
+                lemma_ids TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                lemma_id INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                sentence_id INTEGER NOT NULL,
+                PRIMARY KEY (lemma_id, length, sentence_id)
+            ) WITHOUT ROWID;
+            """)
+        self.__lemma_ids = None
+        self.__lemmas = None
+
+    def close(self):
+        self.__connection.close()
+
+    def sentence_count(self):
+        return self.__connection.execute("SELECT COUNT(*) FROM sentences").fetchone()[0]
+
+    def add_sentences(self, rows):
+        # rows are (sentence, translation, [(lemma, text), ...]) tuples
+        added = 0
+
+        with self.__connection:
+            for sentence, translation, lemmas_and_texts in rows:
+                lemma_ids = sorted(
+                    {
+                        self.__intern(lemma.lower())
+                        for lemma, _ in lemmas_and_texts
+                        if lemma.isalpha()
+                    }
+                )
+                cursor = self.__connection.execute(
+                    "INSERT OR IGNORE INTO sentences "
+                    "(sentence, translation, length, tokens, lemma_ids) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        sentence,
+                        translation,
+                        len(sentence),
+                        json.dumps(lemmas_and_texts, ensure_ascii=False),
+                        json.dumps(lemma_ids),
+                    ),
+                )
+
+                if cursor.rowcount == 0:
+                    continue
+
+                sentence_id = cursor.lastrowid
+                self.__connection.executemany(
+                    "INSERT INTO postings VALUES (?, ?, ?)",
+                    ((lemma_id, len(sentence), sentence_id) for lemma_id in lemma_ids),
+                )
+                added += 1
+
+        return added
+
+    def lookup(self, word, is_unknown, limit, scan_limit=corpus_scan_limit):
+        # returns (unknown_count, sentence, translation, lemmas_and_texts)
+        # tuples of the sentences containing the word, the best ones first.
+        # is_unknown gets a lemma, so that the sentences are ranked by the
+        # same rule the caller ranks its candidates by.
+        row = self.__connection.execute(
+            "SELECT id FROM lemmas WHERE lemma = ?", (word.lower(),)
+        ).fetchone()
+
+        if row is None:
+            return []
+
+        lemmas = self.__load_lemmas()
+        unknown_lemma_ids = {}
+        sentence_ids = []
+
+        # the shortest sentences with at most one unknown lemma, which is the
+        # word itself, found from the stored lemma ids of every sentence with
+        # the word without reading their tokens
+        for sentence_id, lemma_ids in self.__connection.execute(
+            "SELECT s.id, s.lemma_ids "
+            "FROM postings p JOIN sentences s ON s.id = p.sentence_id "
+            "WHERE p.lemma_id = ? ORDER BY p.length",
+            (row[0],),
+        ):
+            unknown_lemmas = 0
+
+            for lemma_id in json.loads(lemma_ids):
+                if lemma_id not in unknown_lemma_ids:
+                    unknown_lemma_ids[lemma_id] = is_unknown(lemmas[lemma_id])
+
+                unknown_lemmas += unknown_lemma_ids[lemma_id]
+
+            if unknown_lemmas <= 1:
+                sentence_ids.append(sentence_id)
+
+                if len(sentence_ids) >= limit:
+                    break
+
+        # short of those, the rest is made up from the shortest sentences
+        # with the word. Only scan_limit of them are looked at, so this is a
+        # heuristic for words with few easy sentences
+        if len(sentence_ids) < limit:
+            sentence_ids.extend(
+                sentence_id
+                for (sentence_id,) in self.__connection.execute(
+                    "SELECT sentence_id FROM postings "
+                    "WHERE lemma_id = ? ORDER BY length LIMIT ?",
+                    (row[0], scan_limit),
+                )
+            )
+            sentence_ids = list(dict.fromkeys(sentence_ids))
+
+        matches = []
+
+        for sentence_id in sentence_ids:
+            sentence, translation, tokens = self.__connection.execute(
+                "SELECT sentence, translation, tokens FROM sentences WHERE id = ?",
+                (sentence_id,),
+            ).fetchone()
+            lemmas_and_texts = json.loads(tokens)
+            unknown_count = sum(
+                1
+                for lemma, _ in lemmas_and_texts
+                if lemma.isalpha() and is_unknown(lemma)
+            )
+            matches.append((unknown_count, sentence, translation, lemmas_and_texts))
+
+        matches.sort(key=lambda match: (match[0], len(match[1])))
+
+        return matches[:limit]
+
+    def sentence_lemmas(self, word, limit):
+        # lemma sets of the shortest sentences containing the word
+        row = self.__connection.execute(
+            "SELECT id FROM lemmas WHERE lemma = ?", (word.lower(),)
+        ).fetchone()
+
+        if row is None:
+            return []
+
+        lemmas = self.__load_lemmas()
+
+        return [
+            [lemmas[lemma_id] for lemma_id in json.loads(lemma_ids)]
+            for (lemma_ids,) in self.__connection.execute(
+                "SELECT s.lemma_ids "
+                "FROM postings p JOIN sentences s ON s.id = p.sentence_id "
+                "WHERE p.lemma_id = ? ORDER BY p.length LIMIT ?",
+                (row[0], limit),
+            )
+        ]
+
+    def __load_lemmas(self):
+        if self.__lemmas is None:
+            self.__lemmas = dict(
+                self.__connection.execute("SELECT id, lemma FROM lemmas")
+            )
+            self.__lemma_ids = {
+                lemma: lemma_id for lemma_id, lemma in self.__lemmas.items()
+            }
+
+        return self.__lemmas
+
+    def __intern(self, lemma):
+        self.__load_lemmas()
+
+        if lemma not in self.__lemma_ids:
+            lemma_id = self.__connection.execute(
+                "INSERT INTO lemmas (lemma) VALUES (?)", (lemma,)
+            ).lastrowid
+            self.__lemma_ids[lemma] = lemma_id
+            self.__lemmas[lemma_id] = lemma
+
+        return self.__lemma_ids[lemma]
+
+
+@click.command()
+@click.argument("tsv-file")
+@click.argument("corpus-file", default=default_corpus_file_name)
+@click.option("--jobs", default=1, type=click.IntRange(min=1))
+def corpus_import(tsv_file, corpus_file, jobs):
+    nlp = get_model(exclude=lemmatizer_excluded_components)
+    corpus = SentenceCorpus(corpus_file)
+    added = 0
+
+    with Book(tsv_file) as book:
+        pairs, lemmatized_pairs = itertools.tee(read_sentence_pairs(book.lines()))
+        rows = (
+            (sentence, translation, lemmas_and_texts)
+            for (sentence, translation), lemmas_and_texts in zip(
+                pairs,
+                lemmatize_and_map_texts(
+                    nlp,
+                    (sentence for sentence, _ in lemmatized_pairs),
+                    n_process=jobs,
+                ),
+            )
+        )
+
+        batches = iter(
+            lambda: list(itertools.islice(rows, corpus_import_batch_size)), []
+        )
+
+        # progress is tracked by bytes read, unless the size isn't known upfront
+        if book.size is None:
+            for batch in batches:
+                added += corpus.add_sentences(batch)
+        else:
+            with click.progressbar(
+                label="Importing sentences", length=book.size
+            ) as bar:
+                for batch in batches:
+                    added += corpus.add_sentences(batch)
+                    bar.update(book.position - bar.pos)
+
+    click.echo(
+        f"Added {added} sentences, {corpus.sentence_count()} in {corpus_file} now."
+    )
+    corpus.close()
+
+
+def read_sentence_pairs(lines):
+    for line in lines:
+        split = line.rstrip("\n").split("\t")
+
+        if len(split) < 2 or split[0].strip() == "":
+            continue
+
+        yield (split[0].strip(), split[1].strip())
@@ -1,13 +1,20 @@
 import os
 import click
-import nltk
-import deepl
-import uuid
-import azure.cognitiveservices.speech as speechsdk
-from .reverso import ReversoContextAPI
-from nltk.corpus import stopwords
+import functools
+import itertools
+import json
+import threading
+from .disk_cache import DiskCache
+from .metrics import instrumented, metrics
+from .planner import plan_word_order
+from .audio_cache import AudioCache, default_audio_cache_dir
+from .speech import SpeechQueue, default_speech_workers, synthesizers
+from .translation import BackgroundTranslator, load_deepl_cache, make_deepl_translator
+from .sentence_corpus import SentenceCorpus, corpus_candidate_limit
 from .shared import (
     get_model,
+    lemmatize_and_map_texts,
+    lemmatizer_excluded_components,
     load_known_words,
     load_unknown_words,
     default_known_words_file_name,
@@ -15,26 +22,33 @@ from .shared import (
     justify,
     term_lookup,
     load_sentences,
-    output_file_name,
+    spacy_model_name,
+    get_model_version,
 )
-from typing import Dict, Tuple, List
+from .word_index import get_stopwords
+from typing import Dict
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+from array import array
 
-nltk.download("stopwords", quiet=True)
-
-stopword_list = stopwords.words("dutch")
 sentence_limit = 250
-deepl_translator = deepl.Translator(os.environ.get("DEEPL_KEY") or "")
-deepl_cache_file_name = ".deepl_cache.txt"
-speech_config = speechsdk.SpeechConfig(
-    subscription=os.environ.get("SPEECH_KEY"),
-    region=os.environ.get("SPEECH_REGION"),
-)
-speech_config.speech_synthesis_voice_name = "nl-NL-MaartenNeural"
-speech_config.set_speech_synthesis_output_format(
-    speechsdk.SpeechSynthesisOutputFormat.Audio24Khz96KBitRateMonoMp3
-)
+default_prefetch_depth = 3
+default_deepl_prefetch = 5
+reverso_cache_file_name = ".reverso_cache.db"
+reverso_cache_ttl = 30 * 24 * 60 * 60  # in seconds
+reverso_cache_max_size = 256 * 1024 * 1024  # in bytes
+# REVERSO_API_URL points queries at another endpoint, like a local stub
+reverso_api_url = os.environ.get("REVERSO_API_URL")
+# shared by the lookups of every word so their keep-alive connections are
+# reused, created on first use
+reverso_session = None
+reverso_session_lock = threading.Lock()
+candidate_cache_file_name = ".candidate_cache.db"
+candidate_cache_max_size = 256 * 1024 * 1024  # in bytes
+candidate_cache_version = 3
 indent = " " * 4
+Candidate = namedtuple("Candidate", ("sentence", "translation", "texts", "lemma_ids"))
 
 
 @click.command()
@@ -42,7 +56,70 @@ indent = " " * 4
 @click.argument("output-dir")
 @click.option("--resume/--no-resume", default=False, type=bool)
 @click.option("--known-words-file", default=default_known_words_file_name)
-def finder(word_list, output_dir, resume, known_words_file):
+@click.option(
+    "--prefetch",
+    default=default_prefetch_depth,
+    type=click.IntRange(min=0),
+    help="Number of upcoming words to prepare in the background.",
+)
+@click.option(
+    "--corpus",
+    "corpus_file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Sentence corpus built with corpus-import to take candidates from.",
+)
+@click.option(
+    "--offline/--online",
+    default=False,
+    help="Take candidates only from the corpus, only use cached Wiktionary "
+    "definitions and don't translate with DeepL in the background.",
+)
+@click.option(
+    "--plan/--no-plan",
+    default=False,
+    help="Reorder the words so that more of them get a sentence without other unknown words.",
+)
+@click.option(
+    "--deepl-prefetch",
+    default=default_deepl_prefetch,
+    type=click.IntRange(min=0),
+    help="Number of upcoming candidates to translate with DeepL in the background.",
+)
+@click.option(
+    "--speech-workers",
+    default=default_speech_workers,
+    type=click.IntRange(min=1),
+    help="Number of sentences to synthesize at the same time.",
+)
+@click.option(
+    "--synthesizer",
+    default="azure",
+    type=click.Choice(tuple(synthesizers)),
+    help="Speech synthesizer, mock writes text files instead of audio.",
+)
+@click.option(
+    "--audio-cache-dir",
+    default=default_audio_cache_dir,
+    help="Directory of synthesized audio shared between output directories.",
+)
+@instrumented
+def finder(
+    word_list,
+    output_dir,
+    resume,
+    known_words_file,
+    prefetch,
+    corpus_file,
+    offline,
+    plan,
+    deepl_prefetch,
+    speech_workers,
+    synthesizer,
+    audio_cache_dir,
+):
+    if offline and corpus_file is None:
+        raise click.UsageError("--offline needs a --corpus to take candidates from.")
+
     if not resume and os.path.isdir(output_dir):
         click.echo(f"Directory '{output_dir}' already exists.")
         click.echo("Use --resume to continue earlier execution.")
@@ -50,28 +127,146 @@ def finder(word_list, output_dir, resume, known_words_file):
 
     Path(output_dir).mkdir(parents=True, exist_ok=True)
 
-    nlp = get_model()
+    # DeepL is still asked when a translation is swapped in by hand
+    if offline:
+        deepl_prefetch = 0
+
+    nlp = get_model(exclude=lemmatizer_excluded_components)
 
     known_words = load_known_words(known_words_file)
     unknown_words = list(load_unknown_words(word_list).keys())
     existing_sentences = load_sentences(output_dir)
+    audio_cache = AudioCache(audio_cache_dir)
+    speech_queue = SpeechQueue(
+        output_dir, synthesizers[synthesizer](), audio_cache, speech_workers
+    )
+
+    if resume:
+        existing_sentences.update(speech_queue.resume())
+
     deepl_cache = load_deepl_cache()
+    translator = BackgroundTranslator(make_deepl_translator(), deepl_cache)
+    reverso_cache = DiskCache(
+        reverso_cache_file_name,
+        ttl=reverso_cache_ttl,
+        max_size=reverso_cache_max_size,
+    )
+    candidate_cache = DiskCache(
+        candidate_cache_file_name,
+        ttl=reverso_cache_ttl,
+        max_size=candidate_cache_max_size,
+    )
+    corpus = None if corpus_file is None else SentenceCorpus(corpus_file)
+    metrics.watch_cache("audio", audio_cache)
+    metrics.watch_cache("deepl", deepl_cache)
+    metrics.watch_cache("reverso", reverso_cache)
+    metrics.watch_cache("candidates", candidate_cache)
+
+    if plan:
+        with metrics.timer("finder.plan"):
+            unknown_words = plan_unknown_words(
+                unknown_words, known_words, existing_sentences, candidate_cache, corpus
+            )
+
+    prefetcher = WordPrefetcher(
+        functools.partial(
+            collect_word_candidates,
+            nlp,
+            reverso_cache,
+            candidate_cache,
+            corpus,
+            offline,
+        ),
+        functools.partial(term_lookup, offline=offline),
+        unknown_words,
+        known_words,
+        existing_sentences,
+        prefetch,
+    )
+
+    try:
+        review_words(
+            prefetcher,
+            unknown_words,
+            speech_queue,
+            known_words,
+            known_words_file,
+            existing_sentences,
+            translator,
+            deepl_prefetch,
+        )
+    finally:
+        prefetcher.close()
+        translator.close()
+        close_speech_queue(speech_queue)
 
+        if corpus is not None:
+            corpus.close()
+
+        click.echo(
+            f"Reverso cache: {reverso_cache.hits} hits, {reverso_cache.misses} misses"
+        )
+        click.echo(f"Audio cache: {audio_cache.hits} hits, {audio_cache.misses} misses")
+
+
+def close_speech_queue(speech_queue):
+    unfinished_count = speech_queue.unfinished_count()
+
+    if unfinished_count > 0:
+        click.echo(f"Waiting for {unfinished_count} sentences to be synthesized...")
+
+    try:
+        speech_queue.close()
+    except KeyboardInterrupt:
+        speech_queue.close(wait=False)
+        click.echo("Unfinished sentences are synthesized with --resume.")
+        raise
+
+    if speech_queue.failed > 0:
+        click.echo(
+            f"{speech_queue.failed} sentences failed to synthesize, "
+            "use --resume to try them again."
+        )
+
+
+def review_words(
+    prefetcher,
+    unknown_words,
+    speech_queue,
+    known_words,
+    known_words_file,
+    existing_sentences,
+    translator,
+    deepl_prefetch,
+):
     for index, word in enumerate(unknown_words):
         if word in existing_sentences or word in known_words:
             continue
 
-        candidates = find_candidates(nlp, word, known_words, existing_sentences)
+        prefetcher.prefetch(index)
+
+        # time spent waiting on the prefetcher, which is what the prompt is
+        # held up by
+        with metrics.timer("finder.wait"):
+            candidates = prefetcher.candidates(word)
 
         if len(candidates) == 0:
             continue
 
         current_index = 0
         deepl_translation = None
-        etimologies = term_lookup(word)
+
+        with metrics.timer("finder.wait"):
+            etimologies = prefetcher.etimologies(word)
 
         while True:
             sentence, translation, analysis = candidates[current_index]
+            translator.prefetch(
+                candidate_sentence
+                for candidate_sentence, _, _ in candidates[
+                    current_index : current_index + deepl_prefetch
+                ]
+            )
 
             if deepl_translation is not None:
                 translation = deepl_translation
@@ -177,7 +372,7 @@ def finder(word_list, output_dir, resume, known_words_file):
             match action:
                 case "y":
                     output_sentence(
-                        output_dir, word, sentence, translation, existing_sentences
+                        speech_queue, word, sentence, translation, existing_sentences
                     )
                     click.echo()
                     break
@@ -195,7 +390,8 @@ def finder(word_list, output_dir, resume, known_words_file):
 
                 case "t":
                     if deepl_translation is None:
-                        deepl_translation = deepl_translate(sentence, deepl_cache)
+                        with metrics.timer("finder.wait"):
+                            deepl_translation = translator.translate(sentence)
                     else:
                         deepl_translation = None
 
@@ -211,58 +407,376 @@ def finder(word_list, output_dir, resume, known_words_file):
     click.echo("Done!")
 
 
-def find_candidates(nlp, word, known_words, existing_sentences):
-    example_sentences: Dict[str, Tuple[str, int, List[Tuple[str, str]]]] = {}
-    dupes = 0
-    iters = 0
-    api = ReversoContextAPI(word, "", "nl", "en")
+class WordPrefetcher:
+    # Collects candidates and etimologies for the words following the one
+    # under review. Collected candidates keep their lemmas, so they are only
+    # ranked once the word comes up, against the known words and sentences of
+    # that moment.
+
+    def __init__(
+        self,
+        collect,
+        lookup,
+        words,
+        known_words,
+        existing_sentences,
+        depth,
+    ):
+        self.__collect = collect
+        self.__lookup = lookup
+        self.__words = words
+        self.__known_words = known_words
+        self.__existing_sentences = existing_sentences
+        self.__depth = depth
+        self.__candidates = {}
+        self.__etimologies = {}
+        # spaCy models aren't meant to be shared between threads
+        self.__analysis_executor = ThreadPoolExecutor(max_workers=1)
+        self.__lookup_executor = ThreadPoolExecutor(max_workers=max(depth, 1))
+
+    def prefetch(self, index):
+        upcoming = 0
+
+        for word in self.__words[index:]:
+            if upcoming > self.__depth:
+                break
+
+            if word in self.__existing_sentences or word in self.__known_words:
+                continue
+
+            self.__submit_candidates(word)
+            self.__submit_etimologies(word)
+            upcoming += 1
+
+    def candidates(self, word):
+        self.__submit_candidates(word)
+
+        return rank_candidates(
+            self.__candidates.pop(word).result(),
+            self.__known_words,
+            self.__existing_sentences,
+        )
+
+    def etimologies(self, word):
+        self.__submit_etimologies(word)
+
+        return self.__etimologies.pop(word).result()
+
+    def close(self):
+        self.__analysis_executor.shutdown(wait=False, cancel_futures=True)
+        self.__lookup_executor.shutdown(wait=False, cancel_futures=True)
+
+    def __submit_etimologies(self, word):
+        if word not in self.__etimologies:
+            self.__etimologies[word] = self.__lookup_executor.submit(
+                self.__lookup, word
+            )
+
+    def __submit_candidates(self, word):
+        if word in self.__candidates:
+            return
+
+        self.__candidates[word] = self.__analysis_executor.submit(
+            self.__collect,
+            word,
+            frozenset(self.__known_words),
+            dict(self.__existing_sentences),
+        )
+
+
+class LemmaTable:
+    # Interns lemmas, so that collected candidates only hold integer ids.
+
+    def __init__(self):
+        self.lemmas = []
+        self.__ids = {}
+        self.__lock = threading.Lock()
+
+    def intern(self, lemma):
+        if lemma in self.__ids:
+            return self.__ids[lemma]
+
+        with self.__lock:
+            if lemma not in self.__ids:
+                self.__ids[lemma] = len(self.lemmas)
+                self.lemmas.append(lemma)
+
+        return self.__ids[lemma]
+
+
+lemma_table = LemmaTable()
+
+
+def collect_word_candidates(
+    nlp,
+    reverso_cache,
+    candidate_cache,
+    corpus,
+    offline,
+    word,
+    known_words,
+    existing_sentences,
+):
+    candidates = {}
+
+    if corpus is not None:
+        with metrics.timer("finder.corpus"):
+            for _, sentence, translation, lemmas_and_texts in corpus.lookup(
+                word,
+                lambda lemma: analyze_word(lemma, known_words, existing_sentences)
+                == "unknown",
+                corpus_candidate_limit,
+            ):
+                candidates[sentence] = make_candidate(
+                    sentence, translation, lemmas_and_texts
+                )
+
+    if not offline:
+        with metrics.timer("finder.reverso"):
+            for candidate in collect_candidates(
+                nlp,
+                word,
+                known_words,
+                existing_sentences,
+                reverso_cache,
+                candidate_cache,
+            ):
+                candidates.setdefault(candidate.sentence, candidate)
+
+    return list(candidates.values())
+
+
+def plan_unknown_words(
+    unknown_words, known_words, existing_sentences, candidate_cache, corpus
+):
+    # plans with the corpus and the candidates cached by earlier runs, as
+    # querying Reverso for every word upfront would take far too long
+    def sentence_lemmas(word):
+        if corpus is not None:
+            yield from corpus.sentence_lemmas(word, corpus_candidate_limit)
+
+        cached_collection = candidate_cache.get(candidate_cache_key(word)) or {}
+
+        for _, _, _, lemmas in cached_collection.get("candidates", ()):
+            yield [lemma for lemma in lemmas if lemma.isalpha()]
+
+    return plan_word_order(
+        [
+            word
+            for word in unknown_words
+            if word not in known_words and word not in existing_sentences
+        ],
+        sentence_lemmas,
+        lambda lemma: analyze_word(lemma, known_words, existing_sentences) != "unknown",
+    )
+
+
+def find_candidates(nlp, word, known_words, existing_sentences, reverso_cache=None):
+    return rank_candidates(
+        collect_candidates(nlp, word, known_words, existing_sentences, reverso_cache),
+        known_words,
+        existing_sentences,
+    )
+
+
+def collect_candidates(
+    nlp, word, known_words, existing_sentences, reverso_cache=None, candidate_cache=None
+):
+    cache_key = None
+    candidates = []
+    # where the collection stopped for having enough of the best sentences,
+    # as the examples read and the duplicates among them, or None once it
+    # ran out of examples
+    resume_at = (0, 0)
+
+    if candidate_cache is not None:
+        cache_key = candidate_cache_key(word)
+        cached_collection = candidate_cache.get(cache_key)
+
+        if cached_collection is not None:
+            candidates = [
+                load_candidate(candidate)
+                for candidate in cached_collection["candidates"]
+            ]
+            resume_at = cached_collection["resume_at"]
+
     best_found = 0
 
-    for source, target in api.get_examples():
+    def is_enough(candidate):
+        nonlocal best_found
+        score, _ = score_candidate(candidate, known_words, existing_sentences)
+
+        if score == 1:
+            best_found += 1
+
+        return best_found >= 10
+
+    # where it stops depends on the known words of the moment, so a cached
+    # collection is cut again and only fetched further when it falls short
+    for index, candidate in enumerate(candidates):
+        if is_enough(candidate):
+            return candidates[: index + 1]
+
+    if resume_at is None:
+        return candidates
+
+    example_sentences: Dict[str, Candidate] = {
+        candidate.sentence: candidate for candidate in candidates
+    }
+    resume_at = collect_reverso_candidates(
+        nlp, word, reverso_cache, example_sentences, resume_at, is_enough
+    )
+    candidates = list(example_sentences.values())
+
+    # an empty result is more likely a hiccup than a word without examples
+    if cache_key is not None and len(candidates) > 0:
+        candidate_cache.set(
+            cache_key,
+            {
+                "candidates": [dump_candidate(candidate) for candidate in candidates],
+                "resume_at": resume_at,
+            },
+        )
+
+    return candidates
+
+
+def collect_reverso_candidates(
+    nlp, word, reverso_cache, example_sentences, resume_at, is_enough
+):
+    from .reverso import API_URL, ReversoContextAPI
+
+    read, dupes = resume_at
+    api = ReversoContextAPI(
+        word,
+        "",
+        "nl",
+        "en",
+        session=get_reverso_session(),
+        api_url=reverso_api_url or API_URL,
+        cache=reverso_cache,
+    )
+
+    # the examples read before are all in example_sentences, so skipping
+    # them again doesn't lemmatize anything
+    for source, target, lemmas_and_texts in itertools.islice(
+        lemmatize_example_pages(nlp, api, example_sentences), read, None
+    ):
         if dupes >= 20:
-            break
+            return None
+
+        read += 1
 
         if source.text in example_sentences:
             dupes += 1
             continue
 
-        score, result = analyze_sentence(
-            nlp,
-            source.text,
-            known_words,
-            existing_sentences,
-        )
-        example_sentences[source.text] = (target.text, score, result)
+        candidate = make_candidate(source.text, target.text, lemmas_and_texts)
+        example_sentences[source.text] = candidate
 
-        if score == 1:
-            best_found += 1
+        if is_enough(candidate):
+            return (read, dupes)
 
-        if best_found >= 10:
-            break
+        if len(example_sentences) >= 300:
+            return None
 
-        iters += 1
+    return None
 
-        if iters >= 300:
-            break
+
+def get_reverso_session():
+    global reverso_session
+
+    with reverso_session_lock:
+        if reverso_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from .reverso import DEFAULT_LOOKAHEAD
+
+            # room for the pages fetched ahead for the current word and for
+            # each of the words prefetched with it
+            adapter = HTTPAdapter(
+                pool_maxsize=DEFAULT_LOOKAHEAD * (default_prefetch_depth + 1)
+            )
+            reverso_session = requests.Session()
+            reverso_session.mount("https://", adapter)
+            reverso_session.mount("http://", adapter)
+
+    return reverso_session
+
+
+def candidate_cache_key(word):
+    # the version tells apart the collections cached before they could be
+    # fetched further
+    return json.dumps(
+        [word, spacy_model_name, get_model_version(), candidate_cache_version],
+        ensure_ascii=False,
+    )
+
+
+def rank_candidates(candidates, known_words, existing_sentences):
+    scored_candidates = [
+        (candidate, *score_candidate(candidate, known_words, existing_sentences))
+        for candidate in candidates
+    ]
 
     return [
-        (s.replace("\t", " "), t.replace("\t", " "), a)
-        for s, (t, _, a) in sorted(
-            example_sentences.items(), key=lambda entry: (entry[1][1], len(entry[0]))
+        (
+            candidate.sentence.replace("\t", " "),
+            candidate.translation.replace("\t", " "),
+            analysis,
+        )
+        for candidate, _, analysis in sorted(
+            scored_candidates,
+            key=lambda entry: (entry[1], len(entry[0].sentence)),
         )
     ]
 
 
-def analyze_sentence(nlp, sentence, known_words, existing_sentences):
+def make_candidate(sentence, translation, lemmas_and_texts):
+    return Candidate(
+        sentence,
+        translation,
+        tuple(text for _, text in lemmas_and_texts),
+        array(
+            "i",
+            (
+                lemma_table.intern(lemma) if lemma.isalpha() else -1
+                for lemma, _ in lemmas_and_texts
+            ),
+        ),
+    )
+
+
+def dump_candidate(candidate):
+    return [
+        candidate.sentence,
+        candidate.translation,
+        candidate.texts,
+        [
+            lemma_table.lemmas[lemma_id] if lemma_id >= 0 else ""
+            for lemma_id in candidate.lemma_ids
+        ],
+    ]
+
+
+def load_candidate(candidate):
+    sentence, translation, texts, lemmas = candidate
+
+    return make_candidate(sentence, translation, list(zip(lemmas, texts)))
+
+
+def score_candidate(candidate, known_words, existing_sentences):
     unknown_count = 0
     result = []
 
-    for lemma, text in lemmatize_and_map_text(nlp, sentence):
-        if not lemma.isalpha():
+    for text, lemma_id in zip(candidate.texts, candidate.lemma_ids):
+        if lemma_id < 0:
             result.append((text, "known"))
             continue
 
-        word_analysis = analyze_word(lemma, known_words, existing_sentences)
+        word_analysis = analyze_word(
+            lemma_table.lemmas[lemma_id], known_words, existing_sentences
+        )
 
         if word_analysis == "unknown":
             unknown_count += 1
@@ -272,79 +786,53 @@ def analyze_sentence(nlp, sentence, known_words, existing_sentences):
     return (unknown_count, result)
 
 
-def analyze_word(word, known_words, existing_sentences):
-    if word in known_words or word in stopword_list:
-        return "known"
-
-    if word in existing_sentences:
-        return "future"
-
-    return "unknown"
-
-
-def load_deepl_cache():
-    cache = {}
+def lemmatize_example_pages(nlp, api, seen_sentences):
+    for examples in api.get_example_pages():
+        # all new sentences of a page go through the model in one batch
+        new_sentences = list(
+            dict.fromkeys(
+                source.text
+                for source, _ in examples
+                if source.text not in seen_sentences
+            )
+        )
+        lemmatized_sentences = dict(
+            zip(new_sentences, lemmatize_and_map_texts(nlp, new_sentences))
+        )
 
-    try:
-        file = open(deepl_cache_file_name, "r")
-    except IOError:
-        return cache
+        for source, target in examples:
+            yield (source, target, lemmatized_sentences.get(source.text))
 
-    with file:
-        for line in file:
-            line = line.strip()
 
-            if line == "":
-                continue
+def analyze_sentences(nlp, sentences, known_words, existing_sentences):
+    for sentence, lemmas_and_texts in zip(
+        sentences, lemmatize_and_map_texts(nlp, sentences)
+    ):
+        yield score_candidate(
+            make_candidate(sentence, "", lemmas_and_texts),
+            known_words,
+            existing_sentences,
+        )
 
-            split = line.split("\t")
-            cache[split[0]] = split[1]
 
-    return cache
+def analyze_sentence(nlp, sentence, known_words, existing_sentences):
+    return next(analyze_sentences(nlp, [sentence], known_words, existing_sentences))
 
 
-def deepl_translate(sentence, deepl_cache):
-    if sentence in deepl_cache:
-        return deepl_cache[sentence]
+def analyze_word(word, known_words, existing_sentences):
+    if word in known_words or word in get_stopwords():
+        return "known"
 
-    result: deepl.TextResult = deepl_translator.translate_text(
-        sentence,
-        source_lang="NL",
-        target_lang="EN-US",
-    )  # type: ignore
-    translation = result.text.replace("\t", " ")
-    deepl_cache[sentence] = translation
-
-    with open(deepl_cache_file_name, "a") as file:
-        file.write(f"{sentence}\t{translation}\n")
-
-    return translation
-
-
-def output_sentence(output_dir, word, sentence, translation, existing_sentences):
-    audio_file_name = f"{uuid.uuid4()}.mp3"
-    full_audio_file_name = f"{output_dir}/{audio_file_name}"
-    audio_config = speechsdk.audio.AudioOutputConfig(
-        filename=full_audio_file_name
-    )  # type: ignore
-    speech_synth = speechsdk.SpeechSynthesizer(
-        speech_config=speech_config,
-        audio_config=audio_config,
-    )
+    if word in existing_sentences:
+        return "future"
 
-    synth_result = speech_synth.speak_text_async(sentence).get()
+    return "unknown"
 
-    if synth_result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:  # type: ignore
-        raise Exception("Speech synthesis failed.")
 
+def output_sentence(speech_queue, word, sentence, translation, existing_sentences):
     existing_sentences[word] = sentence
-
-    with open(f"{output_dir}/{output_file_name}", "a") as file:
-        file.write(f"{word}\t{sentence}\t{translation}\t{audio_file_name}\n")
+    speech_queue.submit(word, sentence, translation)
 
 
 def lemmatize_and_map_text(nlp, text):
-    text = text.replace("\n", "").strip()
-    docs = nlp.pipe([text])
-    cleaned_lemmas = [[(t.lemma_, t.text) for t in doc] for doc in docs]
-    return cleaned_lemmas[0]
+    return next(lemmatize_and_map_texts(nlp, [text]))
@@ -1,53 +1,142 @@
+import importlib.metadata
+import json
+import os
 import subprocess
-import spacy
+import threading
+import time
 import urllib.parse
-import requests
 import warnings
-from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
-
-spacy_model_name = "nl_core_news_lg"
-default_known_words_file_name = "known.txt"
+from typing import TYPE_CHECKING
+from .known_words import (
+    default_known_words_file_name,
+    load_known_words,
+    add_known_word,
+    add_known_words,
+)
+from .disk_cache import DiskCache
+from .rate_limiter import RateLimiter
+from .lemmatizer_daemon import connect_lemmatizer, lemmatizer_excludable_components
+from .metrics import metrics
+
+# spaCy, requests and BeautifulSoup take a while to import, so they are only
+# imported once they are needed
+if TYPE_CHECKING:
+    import spacy
+
+spacy_model_size = os.environ.get("SPACY_MODEL_SIZE") or "lg"
+spacy_model_name = f"nl_core_news_{spacy_model_size}"
+# components that don't contribute to lemmas and can be left out of the pipeline
+lemmatizer_excluded_components = list(lemmatizer_excludable_components)
+lemmatizer_batch_size = 256
 output_file_name = "-output.txt"
 justify = 25
-wiktionary_api = "https://en.wiktionary.org/api/rest_v1/page/definition"
+# WIKTIONARY_API_URL points lookups at another endpoint, like a local stub
+wiktionary_api = (
+    os.environ.get("WIKTIONARY_API_URL")
+    or "https://en.wiktionary.org/api/rest_v1/page/definition"
+)
+wiktionary_cache_file_name = ".wiktionary_cache.db"
+wiktionary_cache_ttl = 90 * 24 * 60 * 60  # in seconds
+wiktionary_max_retries = 5
+wiktionary_limiter = RateLimiter(rate=1.5, max_rate=20, min_rate=0.2, burst=4)
+wiktionary_session = None
+wiktionary_cache = None
+wiktionary_lock = threading.Lock()
+missing = object()
+model_versions = {}
+
+
+def lemmatize(nlp: "spacy.language.Language", text):
+    text = text.replace("\n", "").strip()
+    docs = timed_pipe(nlp, [text])
+    cleaned_lemmas = [[t.lemma_ for t in doc] for doc in docs]
+    return cleaned_lemmas[0]
 
 
-warnings.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
+def lemmatize_texts(
+    nlp: "spacy.language.Language",
+    texts,
+    batch_size=lemmatizer_batch_size,
+    n_process=1,
+):
+    texts = (text.replace("\n", "").strip() for text in texts)
 
+    for doc in timed_pipe(nlp, texts, batch_size=batch_size, n_process=n_process):
+        yield [t.lemma_ for t in doc]
 
-def lemmatize(nlp: spacy.language.Language, text):
-    text = text.replace("\n", "").strip()
-    docs = nlp.pipe([text])
-    cleaned_lemmas = [[t.lemma_ for t in doc] for doc in docs]
-    return cleaned_lemmas[0]
+
+def lemmatize_and_map_texts(
+    nlp: "spacy.language.Language",
+    texts,
+    batch_size=lemmatizer_batch_size,
+    n_process=1,
+):
+    texts = (text.replace("\n", "").strip() for text in texts)
+
+    for doc in timed_pipe(nlp, texts, batch_size=batch_size, n_process=n_process):
+        yield [(t.lemma_, t.text) for t in doc]
 
 
-def get_model():
+def timed_pipe(nlp: "spacy.language.Language", texts, **kwargs):
+    # only the time spent in the pipeline counts, not the time the caller
+    # spends on each doc
+    docs = iter(nlp.pipe(texts, **kwargs))
+    seconds = 0.0
+    text_count = 0
+    token_count = 0
+
     try:
-        return spacy.load(spacy_model_name)
-    except IOError:
-        subprocess.run(["spacy", "download", spacy_model_name])
-        return spacy.load(spacy_model_name)
+        while True:
+            start = time.perf_counter()
+            doc = next(docs, None)
+            seconds += time.perf_counter() - start
+
+            if doc is None:
+                break
 
+            text_count += 1
+            token_count += len(doc)
+            yield doc
+    finally:
+        metrics.add_time("lemmatize", seconds)
+        metrics.count("lemmatize.texts", text_count)
+        metrics.count("lemmatize.tokens", token_count)
 
-def load_known_words(known_words_file_name):
-    known_words = set()
+
+def get_model(exclude=()):
+    # a running lemmatizer server saves loading the model, and the excluded
+    # components don't matter to it as they don't change lemmas
+    client = connect_lemmatizer(spacy_model_name)
+
+    if client is not None:
+        model_versions[spacy_model_name] = client.info["version"]
+        metrics.count("lemmatizer_server.connections")
+        return client
+
+    with metrics.timer("model.load"):
+        return load_spacy_model(spacy_model_name, exclude=exclude)
+
+
+def load_spacy_model(model_name, exclude=()):
+    import spacy
 
     try:
-        file = open(known_words_file_name)
+        return spacy.load(model_name, exclude=exclude)
     except IOError:
-        return known_words
+        subprocess.run(["spacy", "download", model_name])
+        return spacy.load(model_name, exclude=exclude)
 
-    with file:
-        for line in file:
-            line = line.strip()
-
-            if line == "":
-                continue
 
-            known_words.add(line)
+def get_model_version(model_name=spacy_model_name):
+    # read from the package metadata, as importing spaCy for it would take
+    # longer than a cached run
+    if model_name not in model_versions:
+        try:
+            model_versions[model_name] = importlib.metadata.version(model_name)
+        except importlib.metadata.PackageNotFoundError:
+            model_versions[model_name] = None
 
-    return known_words
+    return model_versions[model_name]
 
 
 def load_unknown_words(unknown_words_file_name):
@@ -71,18 +160,79 @@ def load_unknown_words(unknown_words_file_name):
     return words
 
 
-def add_known_word(known_words_file_name, word, known_words):
-    if word in known_words:
-        return
+def term_lookup(term, lookup_form=True, offline=False):
+    cache = get_wiktionary_cache()
+    cache_key = json.dumps([term, lookup_form], ensure_ascii=False)
+    etimologies = cache.get(cache_key, missing)
+
+    if etimologies is missing and offline:
+        return None
+
+    # words without a Dutch entry are cached as well, as None
+    if etimologies is missing:
+        etimologies = fetch_term_etimologies(term, lookup_form)
+        cache.set(cache_key, etimologies)
+
+    return etimologies
+
+
+def get_wiktionary_cache():
+    global wiktionary_cache
+
+    with wiktionary_lock:
+        if wiktionary_cache is None:
+            wiktionary_cache = DiskCache(
+                wiktionary_cache_file_name, ttl=wiktionary_cache_ttl
+            )
+            metrics.watch_cache("wiktionary", wiktionary_cache)
+
+    return wiktionary_cache
+
+
+def get_wiktionary_session():
+    global wiktionary_session
+
+    with wiktionary_lock:
+        if wiktionary_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            wiktionary_session = requests.Session()
+            wiktionary_session.mount("https://", HTTPAdapter(pool_maxsize=16))
+
+    return wiktionary_session
+
+
+def wiktionary_get(url):
+    session = get_wiktionary_session()
+
+    for attempt in range(wiktionary_max_retries + 1):
+        with metrics.timer("wiktionary.wait"):
+            wiktionary_limiter.acquire()
+
+        with metrics.timer("wiktionary.request"):
+            request = session.get(url)
+
+        metrics.count(f"wiktionary.status.{request.status_code}")
+
+        if request.status_code != 429 and request.status_code < 500:
+            wiktionary_limiter.succeeded()
+            return request
+
+        retry_after = request.headers.get("Retry-After", "")
+        wiktionary_limiter.throttled(
+            int(retry_after) if retry_after.isdigit() else 2**attempt
+        )
+
+    return request
 
-    with open(f"./{known_words_file_name}", "a") as f:
-        f.write(f"{word}\n")
-        known_words.add(word)
 
+def fetch_term_etimologies(term, lookup_form):
+    from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
 
-def term_lookup(term, lookup_form=True):
+    warnings.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
     encoded_term = urllib.parse.quote_plus(term.lower())
-    request = requests.get(f"{wiktionary_api}/{encoded_term}")
+    request = wiktionary_get(f"{wiktionary_api}/{encoded_term}")
 
     if (
         request.status_code == 404
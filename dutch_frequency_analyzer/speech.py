@@ -0,0 +1,214 @@
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .audio_cache import audio_cache_key, audio_file_extension
+from .metrics import metrics
+from .shared import load_sentences, output_file_name
+
+speech_queue_file_name = ".speech_queue.db"
+speech_voice_name = "nl-NL-MaartenNeural"
+speech_output_format = "Audio24Khz96KBitRateMonoMp3"
+speech_retry_count = 3
+speech_retry_delay = 2  # in seconds, doubled on every retry
+default_speech_workers = 4
+
+
+class AzureSynthesizer:
+    voice_name = speech_voice_name
+    output_format = speech_output_format
+
+    def __init__(self):
+        # the Speech SDK takes a while to import
+        import azure.cognitiveservices.speech as speechsdk
+
+        self.__speechsdk = speechsdk
+        self.__speech_config = speechsdk.SpeechConfig(
+            subscription=os.environ.get("SPEECH_KEY"),
+            region=os.environ.get("SPEECH_REGION"),
+        )
+        self.__speech_config.speech_synthesis_voice_name = self.voice_name
+        self.__speech_config.set_speech_synthesis_output_format(
+            getattr(speechsdk.SpeechSynthesisOutputFormat, self.output_format)
+        )
+
+    def synthesize(self, text, file_name):
+        speechsdk = self.__speechsdk
+        audio_config = speechsdk.audio.AudioOutputConfig(
+            filename=file_name
+        )  # type: ignore
+        speech_synth = speechsdk.SpeechSynthesizer(
+            speech_config=self.__speech_config,
+            audio_config=audio_config,
+        )
+
+        synth_result = speech_synth.speak_text_async(text).get()
+
+        if synth_result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:  # type: ignore
+            raise Exception("Speech synthesis failed.")
+
+
+class MockSynthesizer:
+    # Writes the text instead of audio, for trying things out without Azure.
+    voice_name = "mock"
+    output_format = "text"
+
+    def __init__(self, delay=0.5):
+        self.delay = delay
+
+    def synthesize(self, text, file_name):
+        time.sleep(self.delay)
+
+        with open(file_name, "w") as file:
+            file.write(f"{text}\n")
+
+
+synthesizers = {"azure": AzureSynthesizer, "mock": MockSynthesizer}
+
+
+class SpeechQueue:
+    # Synthesizes accepted sentences on a pool of workers. Jobs are stored in
+    # the output directory before they are started, and an output row is only
+    # written once its audio file exists, so an interrupted run leaves behind
+    # jobs that the next one picks up again. Audio files are named by their
+    # audio cache key, and only synthesized when they aren't cached yet.
+
+    def __init__(
+        self, output_dir, synthesizer, audio_cache, workers=default_speech_workers
+    ):
+        self.output_dir = output_dir
+        self.failed = 0
+        self.__synthesizer = synthesizer
+        self.__audio_cache = audio_cache
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(
+            f"{output_dir}/{speech_queue_file_name}",
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self.__connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                word TEXT NOT NULL,
+                sentence TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                audio TEXT NOT NULL
+            )
+            """)
+        self.__closed = False
+        self.__futures = set()
+        self.__executor = ThreadPoolExecutor(max_workers=workers)
+
+    def resume(self):
+        # restarts the jobs of an earlier run and returns their sentences by
+        # word. Jobs whose row made it into the output file before the
+        # interruption are done already.
+        written_sentences = load_sentences(self.output_dir, extended=True)
+
+        with self.__lock:
+            jobs = self.__connection.execute(
+                "SELECT id, word, sentence, translation, audio FROM jobs"
+            ).fetchall()
+
+        for job in jobs:
+            job_id, word, _, _, audio = job
+
+            if written_sentences.get(word, {}).get("audio") == audio:
+                self.__finish(job_id)
+            else:
+                self.__start(job)
+
+        return {word: sentence for _, word, sentence, _, _ in jobs}
+
+    def submit(self, word, sentence, translation):
+        audio = f"{self.__audio_key(sentence)}{audio_file_extension}"
+
+        with self.__lock:
+            job_id = self.__connection.execute(
+                "INSERT INTO jobs (word, sentence, translation, audio) "
+                "VALUES (?, ?, ?, ?)",
+                (word, sentence, translation, audio),
+            ).lastrowid
+
+        self.__start((job_id, word, sentence, translation, audio))
+
+    def unfinished_count(self):
+        with self.__lock:
+            return sum(1 for future in self.__futures if not future.done())
+
+    def close(self, wait=True):
+        self.__executor.shutdown(wait=wait, cancel_futures=not wait)
+
+        # without waiting, running jobs can still finish after this, and
+        # leave their job behind for --resume to clear
+        with self.__lock:
+            self.__closed = True
+            self.__connection.close()
+
+    def __start(self, job):
+        future = self.__executor.submit(self.__run, *job)
+
+        with self.__lock:
+            self.__futures = {future for future in self.__futures if not future.done()}
+            self.__futures.add(future)
+
+    def __audio_key(self, sentence):
+        return audio_cache_key(
+            sentence, self.__synthesizer.voice_name, self.__synthesizer.output_format
+        )
+
+    def __run(self, job_id, word, sentence, translation, audio):
+        # the key is computed again, as jobs queued by earlier versions have
+        # random audio file names
+        key = self.__audio_key(sentence)
+        audio_file_name = f"{self.output_dir}/{audio}"
+
+        # another word in the output directory could have the same sentence
+        if not os.path.exists(audio_file_name) and not self.__audio_cache.fetch(
+            key, audio_file_name
+        ):
+            if not self.__synthesize(sentence, audio_file_name):
+                return
+
+            self.__audio_cache.store(key, audio_file_name)
+
+        with self.__lock:
+            with open(f"{self.output_dir}/{output_file_name}", "a") as file:
+                file.write(f"{word}\t{sentence}\t{translation}\t{audio}\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+        self.__finish(job_id)
+
+    def __synthesize(self, sentence, audio_file_name):
+        # written under a temporary name first, so that an audio file in the
+        # output directory is always complete
+        temp_file_name = f"{audio_file_name}.{threading.get_ident()}.tmp"
+
+        for attempt in range(speech_retry_count + 1):
+            try:
+                with metrics.timer("tts.request"):
+                    self.__synthesizer.synthesize(sentence, temp_file_name)
+
+                os.replace(temp_file_name, audio_file_name)
+
+                return True
+            except Exception:
+                metrics.count("tts.errors")
+
+                with self.__lock:
+                    # left in the queue for the next --resume
+                    if attempt == speech_retry_count or self.__closed:
+                        self.failed += 1
+
+                        return False
+
+                time.sleep(speech_retry_delay * 2**attempt)
+
+    def __finish(self, job_id):
+        with self.__lock:
+            if self.__closed:
+                return
+
+            self.__connection.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
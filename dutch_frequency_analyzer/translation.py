@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .disk_cache import DiskCache
+from .metrics import metrics
+
+deepl_cache_file_name = ".deepl_cache.db"
+legacy_deepl_cache_file_name = ".deepl_cache.txt"
+deepl_source_lang = "NL"
+deepl_target_lang = "EN-US"
+deepl_batch_size = 50
+
+
+def make_deepl_translator():
+    # DEEPL_SERVER_URL points the client at another endpoint, like a local
+    # stub for testing
+    import deepl
+
+    return deepl.Translator(
+        os.environ.get("DEEPL_KEY") or "",
+        server_url=os.environ.get("DEEPL_SERVER_URL") or None,
+    )
+
+
+def load_deepl_cache():
+    cache = DiskCache(deepl_cache_file_name)
+
+    if os.path.exists(legacy_deepl_cache_file_name):
+        import_legacy_deepl_cache(cache, legacy_deepl_cache_file_name)
+
+    return cache
+
+
+def import_legacy_deepl_cache(cache, file_name):
+    with open(file_name, "r") as file:
+        for line in file:
+            line = line.strip()
+
+            if line == "":
+                continue
+
+            split = line.split("\t")
+
+            if len(split) < 2:
+                continue
+
+            key = deepl_cache_key(split[0])
+
+            if key not in cache:
+                cache.set(key, split[1])
+
+    # kept around rather than deleted, but never read again
+    os.replace(file_name, f"{file_name}.imported")
+
+
+def deepl_cache_key(sentence):
+    return json.dumps(
+        [sentence, deepl_source_lang, deepl_target_lang], ensure_ascii=False
+    )
+
+
+class BackgroundTranslator:
+    # Translates sentences with DeepL ahead of time, in batches on a
+    # background thread, so that showing a translation doesn't have to wait
+    # for the API. Every translation ends up in the cache.
+
+    def __init__(self, translator, cache):
+        self.__translator = translator
+        self.__cache = cache
+        self.__pending = {}
+        self.__lock = threading.Lock()
+        self.__executor = ThreadPoolExecutor(max_workers=1)
+
+    def prefetch(self, sentences):
+        with self.__lock:
+            new_sentences = [
+                sentence
+                for sentence in dict.fromkeys(sentences)
+                if sentence not in self.__pending
+                and deepl_cache_key(sentence) not in self.__cache
+            ]
+
+            for start in range(0, len(new_sentences), deepl_batch_size):
+                batch = new_sentences[start : start + deepl_batch_size]
+                future = self.__executor.submit(self.__translate_batch, batch)
+
+                for sentence in batch:
+                    self.__pending[sentence] = future
+
+    def translate(self, sentence):
+        translation = self.__cache.get(deepl_cache_key(sentence))
+
+        if translation is not None:
+            return translation
+
+        with self.__lock:
+            future = self.__pending.get(sentence)
+
+        # a failed background batch is retried on its own, so that its error
+        # shows up here
+        if future is not None and future.exception() is None:
+            return future.result()[sentence]
+
+        return self.__translate_batch([sentence])[sentence]
+
+    def close(self):
+        self.__executor.shutdown(wait=False, cancel_futures=True)
+
+    def __translate_batch(self, sentences):
+        try:
+            with metrics.timer("deepl.request"):
+                results = self.__translator.translate_text(
+                    sentences,
+                    source_lang=deepl_source_lang,
+                    target_lang=deepl_target_lang,
+                )
+
+            metrics.count("deepl.sentences", len(sentences))
+            translations = {}
+
+            for sentence, result in zip(sentences, results):
+                translations[sentence] = result.text.replace("\t", " ")
+                self.__cache.set(deepl_cache_key(sentence), translations[sentence])
+
+            return translations
+        finally:
+            with self.__lock:
+                for sentence in sentences:
+                    self.__pending.pop(sentence, None)
@@ -0,0 +1,168 @@
+import click
+import mmap
+import os
+import zlib
+from array import array
+
+dutch_words_file_name = "dutch_words.txt"
+dutch_words_index_file_name = "dutch_words.idx"
+stopwords_index_file_name = "dutch_stopwords.idx"
+word_index_magic = b"DFAWIDX1"
+# magic followed by the word count and the hash slot count
+word_index_header_size = 16
+stopword_index = None
+
+
+class WordIndex:
+    # A sorted table of UTF-8 strings plus an open addressing hash table over
+    # it, memory-mapped from disk. The position of a word in the sorted table
+    # doubles as its id.
+
+    def __init__(self, index_file_name):
+        with open(index_file_name, "rb") as file:
+            self.__mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.__mmap[: len(word_index_magic)] != word_index_magic:
+            raise ValueError(f"{index_file_name} is not a word index")
+
+        view = memoryview(self.__mmap)
+        self.__count, slot_count = view[
+            len(word_index_magic) : word_index_header_size
+        ].cast("I")
+        slots_start = word_index_header_size + 4 * (self.__count + 1)
+        strings_start = slots_start + 4 * slot_count
+        self.__offsets = view[word_index_header_size:slots_start].cast("I")
+        self.__slots = view[slots_start:strings_start].cast("I")
+        self.__slot_mask = slot_count - 1
+        self.__strings = view[strings_start:]
+
+    def __len__(self):
+        return self.__count
+
+    def __contains__(self, word):
+        return self.index_of(word) >= 0
+
+    def __iter__(self):
+        for index in range(self.__count):
+            yield self.word(index)
+
+    def index_of(self, word):
+        encoded = word.encode()
+        slot = zlib.crc32(encoded) & self.__slot_mask
+
+        while entry := self.__slots[slot]:
+            index = entry - 1
+
+            if (
+                self.__strings[self.__offsets[index] : self.__offsets[index + 1]]
+                == encoded
+            ):
+                return index
+
+            slot = (slot + 1) & self.__slot_mask
+
+        return -1
+
+    def word(self, index):
+        return bytes(
+            self.__strings[self.__offsets[index] : self.__offsets[index + 1]]
+        ).decode()
+
+
+@click.command()
+@click.option("--dictionary-file", default=dutch_words_file_name)
+@click.option("--dictionary-index-file", default=dutch_words_index_file_name)
+@click.option("--stopwords-index-file", default=stopwords_index_file_name)
+def indexer(dictionary_file, dictionary_index_file, stopwords_index_file):
+    word_count = build_word_index(
+        read_word_file(dictionary_file), dictionary_index_file
+    )
+    click.echo(f"Indexed {word_count} dictionary words into {dictionary_index_file}.")
+
+    word_count = build_word_index(read_stopwords(), stopwords_index_file)
+    click.echo(f"Indexed {word_count} stopwords into {stopwords_index_file}.")
+
+
+def build_word_index(words, index_file_name):
+    encoded_words = sorted({word.encode() for word in words if word != ""})
+    offsets = array("I", [0])
+    # a load factor of at most one half keeps the probe sequences short
+    slot_count = 1 << (2 * len(encoded_words)).bit_length()
+    slots = array("I", bytes(4 * slot_count))
+
+    for index, encoded_word in enumerate(encoded_words):
+        offsets.append(offsets[-1] + len(encoded_word))
+        slot = zlib.crc32(encoded_word) & (slot_count - 1)
+
+        while slots[slot]:
+            slot = (slot + 1) & (slot_count - 1)
+
+        # zero marks an empty slot, so ids are stored off by one
+        slots[slot] = index + 1
+
+    temp_file_name = f"{index_file_name}.{os.getpid()}.tmp"
+
+    with open(temp_file_name, "wb") as file:
+        file.write(word_index_magic)
+        file.write(array("I", [len(encoded_words), slot_count]).tobytes())
+        file.write(offsets.tobytes())
+        file.write(slots.tobytes())
+
+        for encoded_word in encoded_words:
+            file.write(encoded_word)
+
+    os.replace(temp_file_name, index_file_name)
+
+    return len(encoded_words)
+
+
+def read_word_file(file_name):
+    with open(file_name) as file:
+        for line in file:
+            yield line.strip()
+
+
+def read_stopwords():
+    import nltk
+    from nltk.corpus import stopwords
+
+    nltk.download("stopwords", quiet=True)
+
+    return stopwords.words("dutch")
+
+
+def load_dutch_words():
+    if is_index_stale(dutch_words_index_file_name, dutch_words_file_name):
+        build_word_index(
+            read_word_file(dutch_words_file_name), dutch_words_index_file_name
+        )
+
+    return WordIndex(dutch_words_index_file_name)
+
+
+def load_stopwords():
+    if is_index_stale(stopwords_index_file_name):
+        build_word_index(read_stopwords(), stopwords_index_file_name)
+
+    return WordIndex(stopwords_index_file_name)
+
+
+def get_stopwords():
+    global stopword_index
+
+    if stopword_index is None:
+        stopword_index = load_stopwords()
+
+    return stopword_index
+
+
+def is_index_stale(index_file_name, source_file_name=None):
+    try:
+        index_mtime = os.path.getmtime(index_file_name)
+    except OSError:
+        return True
+
+    if source_file_name is None:
+        return False
+
+    return index_mtime < os.path.getmtime(source_file_name)